@@ -1,6 +1,8 @@
+import os
 import streamlit as st
 import base64
 from src.pipeline import DocumentPipeline
+from config import LARGE_FILE
 
 # ================= INIT PIPELINE ================= #
 @st.cache_resource
@@ -29,7 +31,7 @@ if "temp_path" not in st.session_state:
 st.sidebar.header("📂 Upload Document")
 
 uploaded_file = st.sidebar.file_uploader(
-    "Upload PDF / TXT / DOCX", type=["pdf", "txt", "docx"]
+    "Upload PDF / TXT / DOCX / XLSX", type=["pdf", "txt", "docx", "xlsx"]
 )
 
 # ✅ Load document only ONCE (no repeated processing)
@@ -39,8 +41,15 @@ if uploaded_file:
         with open(temp_path, "wb") as f:
             f.write(uploaded_file.getbuffer())
 
-        with st.sidebar.spinner("Processing document..."):
-            pipeline.upload_document(temp_path)
+        if os.path.getsize(temp_path) >= LARGE_FILE:
+            # Large files are indexed batch by batch and reported as they go
+            status = st.sidebar.empty()
+            for progress in pipeline.stream_document(temp_path):
+                status.info(f"Indexed {progress['chunks']} chunks (page {progress['pages']})...")
+            status.success(f"Indexed {len(pipeline.chunks)} chunks")
+        else:
+            with st.sidebar.spinner("Processing document..."):
+                pipeline.upload_document(temp_path)
 
         st.session_state.loaded_doc = uploaded_file.name
         st.session_state.temp_path = temp_path
@@ -70,6 +79,29 @@ if st.sidebar.button("✨ Highlight PDF"):
     else:
         st.sidebar.warning("Upload PDF and enter keywords!")
 
+# ================= SIDEBAR: CORPUS ================= #
+st.sidebar.markdown("---")
+st.sidebar.subheader("📚 Corpus")
+
+if st.sidebar.button("➕ Add document to corpus"):
+    if temp_path:
+        with st.sidebar.spinner("Adding to corpus..."):
+            pipeline.add_to_corpus(temp_path)
+    else:
+        st.sidebar.warning("Upload a document first!")
+
+corpus_docs = {f"{d['name']} (#{d['doc_id']})": d["doc_id"] for d in pipeline.corpus.documents()}
+selected_docs = st.sidebar.multiselect("Ask across corpus documents:", list(corpus_docs))
+
+if selected_docs and st.sidebar.button("🗑️ Remove selected from corpus"):
+    for label in selected_docs:
+        pipeline.remove_from_corpus(corpus_docs[label])
+    st.rerun()
+
+# ================= SIDEBAR: MODELS ================= #
+with st.sidebar.expander("⚙️ Model status"):
+    st.json(pipeline.model_stats())
+
 # ================= MAIN LAYOUT ================= #
 col_pdf, col_chat = st.columns([1.5, 1])
 
@@ -93,18 +125,29 @@ with col_pdf:
 with col_chat:
     st.subheader("💬 Chat with Document")
 
-    if not uploaded_file:
-        st.info("📂 Upload a document to start chatting.")
+    if not uploaded_file and not selected_docs:
+        st.info("📂 Upload a document (or select corpus documents) to start chatting.")
     else:
         user_input = st.chat_input("Ask a question...")
 
+        for role, msg in st.session_state.chat_history:
+            with st.chat_message(role):
+                st.write(msg)
+
         if user_input:
-            with st.spinner("🤖 Thinking..."):
-                answer, chunks, debug_info = pipeline.chat(user_input)
+            with st.chat_message("user"):
+                st.write(user_input)
+
+            with st.spinner("🔍 Searching..."):
+                if selected_docs:
+                    doc_ids = [corpus_docs[label] for label in selected_docs]
+                    stream, chunks, debug_info = pipeline.chat_corpus(user_input, doc_ids=doc_ids, stream=True)
+                else:
+                    stream, chunks, debug_info = pipeline.chat_stream(user_input)
+
+            # Generative answers appear token by token as they are produced
+            with st.chat_message("assistant"):
+                answer = st.write_stream(stream)
 
             st.session_state.chat_history.append(("user", user_input))
             st.session_state.chat_history.append(("assistant", answer))
-
-        for role, msg in st.session_state.chat_history:
-            with st.chat_message(role):
-                st.write(msg)
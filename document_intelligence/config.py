@@ -7,19 +7,109 @@ SRC_DIR = BASE_DIR / "src"
 RESEARCH_DIR = BASE_DIR / "research"
 MODELS_DIR = BASE_DIR / "models"
 DATA_DIR = BASE_DIR / "data"
+CACHE_DIR = BASE_DIR / "cache"
 
 # # Model configuration
 MODEL_NAME = "microsoft/phi-3-mini-4k-instruct"
 LOCAL_MODEL_PATH = MODELS_DIR / "phi-3"
 
+# Model loading: models load on first use; these are also warmed in a background thread
+MODEL_WARMUP = ["embedding", "extractive", "generator_tokenizer"]
+MODEL_IDLE_SECONDS = 600  # the generative model is unloaded after this long unused (None = never)
+
+# Generative model artifacts (written by download_model.py)
+ARTIFACT_SHARD_SIZE = "1GB"  # safetensors shard size
+GENERATOR_VARIANT = "auto"   # auto | fp32 | bf16 | int8 (auto: fastest measured fp32/bf16; int8 is opt-in)
+
+# Extractive QA: all retrieved chunks are scored in one batched pipeline call
+EXTRACTIVE_BATCH_SIZE = 8
+EXTRACTIVE_DOC_STRIDE = 128   # token overlap when a chunk is longer than the model window
+EXTRACTIVE_MAX_SEQ_LEN = 384
+
+# Prompts generated together by QAModel.generate_answers (batch runs and experiments)
+GENERATION_BATCH_SIZE = 8
+
+# Generation policy per query complexity (AdaptiveChunker.analyze_query_complexity):
+# short factual answers decode greedily and end at the first finished line
+GENERATION_POLICY = {
+    "simple": {"max_new_tokens": 48, "do_sample": False, "stop_on_newline": True},
+    "medium": {"max_new_tokens": 96, "do_sample": True, "temperature": 0.3, "stop_on_newline": True},
+    "complex": {"max_new_tokens": 160, "do_sample": True, "temperature": 0.3, "stop_on_newline": False},
+}
+GENERATION_STOP_STRINGS = ["\nQuestion:", "\nDocument:", "\nYou are an AI assistant"]
+
+# Prefix KV cache: the prompt header and recent contexts are prefilled once and reused
+PREFIX_CACHE_ENABLED = True
+PREFIX_CACHE_MAX_TOKENS = 2048  # KV memory grows per cached token (~0.4MB/token for Phi-3 in fp16)
+
+# Context packing: retrieved chunks fill this many generator tokens as whole, de-duplicated sentences
+CONTEXT_TOKEN_BUDGET = 512
+CONTEXT_CACHE_ITEMS = 10_000  # cached sentence splits / token counts
+
+# Entity index: factual questions are answered from it when a kind has at most this many values
+ENTITY_MAX_ANSWERS = 3
+
+# Answer cache: repeated and near-identical questions on the same index skip retrieval and generation
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_MAX_ITEMS = 1024
+ANSWER_CACHE_TTL = 3600          # seconds (None = never expire)
+ANSWER_CACHE_SIMILARITY = 0.95   # question-embedding cosine for near duplicates (None = exact only)
+
 # Embedding model
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DEVICE = "auto"     # auto | cuda | mps | cpu
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_BACKEND = "torch"   # torch | int8 (dynamically quantised, CPU only)
+
+# Embedding cache (in-process LRU in front of a local SQLite store)
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_DB = CACHE_DIR / "embeddings.sqlite"
+EMBEDDING_CACHE_MEMORY_ITEMS = 50_000
+EMBEDDING_CACHE_MAX_ROWS = 500_000  # ~750MB of 384-dim vectors on disk, oldest written evicted first
+
+# Retrieval index storage: float32, or float16 to halve index memory
+# (float16 is upcast block by block when scoring, so it costs some query CPU)
+RETRIEVER_DTYPE = "float32"
+
+# Search index: "exact" brute force, "ivf" approximate (inverted file), "pq" (product quantised)
+# or "pca" (reduced-dimension prefilter + exact re-scoring)
+RETRIEVER_INDEX = "exact"
+IVF_NLIST = None             # number of lists; None = ~4*sqrt(chunks)
+IVF_NPROBE = 16              # lists scanned per query: higher = better recall, slower
+IVF_MIN_TRAIN_SIZE = 20_000  # below this many chunks search stays exact
+
+# "pq" stores product-quantised codes in RAM, spills full vectors to disk and re-scores
+# the best PQ_RERANK candidates exactly
+PQ_SUBVECTORS = 48          # bytes per chunk; must divide the embedding dim (384 for MiniLM)
+PQ_RERANK = 100
+PQ_MIN_TRAIN_SIZE = 20_000  # below this many chunks search stays exact
+PQ_SPILL_DIR = CACHE_DIR / "retriever"
+
+# "pca" scans a PCA_DIM-dim projection to shortlist PCA_CANDIDATES chunks, then re-scores them
+PCA_DIM = 64
+PCA_CANDIDATES = 300
+PCA_MIN_TRAIN_SIZE = 10_000  # below this many chunks search stays exact
+
+# Retrieval mode: "dense" embeddings only, or "hybrid" dense + BM25 fused by reciprocal rank
+RETRIEVAL_MODE = "hybrid"
+RRF_K = 60             # rank damping constant of reciprocal-rank fusion
+RRF_CANDIDATES = 50    # candidates taken from each ranking before fusion
+BM25_K1 = 1.5
+BM25_B = 0.75
 
 # OCR paths (Windows)
 # POPPLER_PATH = r"C:/poppler-25.12.0/Library/bin"
 # TESSERACT_PATH = r"C:/Program Files/Tesseract-OCR/tesseract.exe"
 POPPLER_PATH = r"C:/poppler-25.12.0/Library/bin"
 TESSERACT_PATH = r"C:/Program Files/Tesseract-OCR/tesseract.exe"
+
+# OCR
+OCR_DPI = 300
+OCR_MIN_DOCUMENT_CHARS = 100  # PDFs with less text-layer text than this are OCRed page by page
+OCR_PAGE_LEVEL = False        # opt-in: also OCR single short pages of PDFs that have a text layer
+OCR_MIN_PAGE_CHARS = 50       # with OCR_PAGE_LEVEL, pages with less text than this are OCRed
+OCR_MAX_WORKERS = None   # None = one worker per CPU core
+
 # Neptune AI
 NEPTUNE_PROJECT = "ruffi-22/doc-intelli-rag"
 
@@ -34,6 +124,21 @@ SMALL_FILE = 100_000    # 100KB
 MEDIUM_FILE = 1_000_000  # 1MB
 LARGE_FILE = 10_000_000  # 10MB
 
+# Streaming ingestion (files >= LARGE_FILE are ingested page by page)
+EMBED_BATCH_SIZE = 64   # chunks embedded and indexed per batch
+TEXT_PAGE_LINES = 200   # lines per "page" when streaming plain text
+DOCX_BLOCK_CHARS = 5000  # paragraphs/tables grouped into blocks of ~this size
+EXCEL_ROWS_PER_GROUP = 50  # spreadsheet rows per record (header repeated)
+# Zipped formats whose file size says little about their text size are always streamed
+STREAMING_EXTENSIONS = ['.xlsx', '.docx']
+
+# Ingestion cache (keyed by file content hash + chunker/embedding settings)
+INGESTION_CACHE_DIR = CACHE_DIR / "ingestion"
+INGESTION_CACHE_MAX_BYTES = 2_000_000_000  # 2GB, least recently used evicted first
+
+# Multi-document corpus (memory-mapped embeddings + chunk side table)
+CORPUS_DIR = DATA_DIR / "corpus"
+
 # Create directories
-for dir_path in [MODELS_DIR, DATA_DIR]:
+for dir_path in [MODELS_DIR, DATA_DIR, CACHE_DIR]:
     dir_path.mkdir(exist_ok=True)
\ No newline at end of file
@@ -1,70 +1,51 @@
-# download_working.py
+# download_model.py
+import argparse
 import os
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
 
-print("="*60)
-print("DOWNLOADING PHI-3 MODEL")
-print("="*60)
+from config import MODEL_NAME, LOCAL_MODEL_PATH
+from src.model_artifacts import VARIANTS, prepare_artifacts, measure_artifacts
 
-MODEL_NAME = "microsoft/phi-3-mini-4k-instruct"
-SAVE_DIR = "models/phi-3"
 
-# Create directory
-os.makedirs(SAVE_DIR, exist_ok=True)
+def main():
+    parser = argparse.ArgumentParser(description="Download Phi-3 and prepare fast-loading artifacts")
+    parser.add_argument("--model", default=MODEL_NAME, help="Hugging Face model id or local path")
+    parser.add_argument("--out", default=str(LOCAL_MODEL_PATH), help="Artifact directory")
+    parser.add_argument("--variants", nargs="+", default=["fp32", "bf16", "int8"], choices=VARIANTS,
+                        help="Variants to prepare (int8 is quantised at load time from the fp32 shards)")
+    parser.add_argument("--measure", action="store_true",
+                        help="Measure CPU load time and peak RSS of each variant")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"PREPARING {args.model}")
+    print("=" * 60)
 
-try:
-    print("\n1. Downloading tokenizer...")
-    tokenizer = AutoTokenizer.from_pretrained(
-        MODEL_NAME,
-        trust_remote_code=True
-    )
-    tokenizer.save_pretrained(SAVE_DIR)
-    print("   ✅ Tokenizer saved")
-    
-    print("\n2. Downloading model...")
-    
-    # Try different approaches
     try:
-        # First try with eager attention
-        model = AutoModelForCausalLM.from_pretrained(
-            MODEL_NAME,
-            trust_remote_code=True,
-            attn_implementation="eager",
-            torch_dtype=torch.float32,
-            low_cpu_mem_usage=True
-        )
-        print("   ✅ Downloaded with eager attention")
-        
-    except Exception as e1:
-        print(f"   ⚠️ First attempt failed: {e1}")
-        
-        # Try without any special parameters
-        model = AutoModelForCausalLM.from_pretrained(
-            MODEL_NAME,
-            trust_remote_code=True
-        )
-        print("   ✅ Downloaded with default settings")
-    
-    # Save the model
-    model.save_pretrained(SAVE_DIR)
-    print("   ✅ Model saved")
-    
-    # Verify files
-    print(f"\n3. Verifying download...")
-    files = os.listdir(SAVE_DIR)
-    print(f"   Found {len(files)} files:")
-    for file in files:
-        size = os.path.getsize(os.path.join(SAVE_DIR, file))
-        print(f"   - {file} ({size/1024/1024:.1f} MB)")
-    
-    print("\n" + "="*60)
-    print("🎉 SUCCESS! Model is ready to use.")
-    print("="*60)
-    
-except Exception as e:
-    print(f"\n❌ ERROR: {e}")
-    print("\n💡 Solutions:")
-    print("1. Update transformers: pip install --upgrade transformers")
-    print("2. Install flash-attention: pip install flash-attn --no-build-isolation")
-    print("3. Or download manually from huggingface.co/microsoft/phi-3-mini-4k-instruct")
\ No newline at end of file
+        print("\n1. Downloading and writing safetensors shards...")
+        manifest = prepare_artifacts(args.model, args.out, variants=args.variants)
+
+        # Verify files
+        print(f"\n2. Verifying artifacts in {args.out}...")
+        for variant, info in manifest["variants"].items():
+            print(f"   - {variant}: {info['path']}/ ({info['bytes'] / 1024 / 1024:.1f} MB)")
+        files = [f for f in os.listdir(args.out) if os.path.isfile(os.path.join(args.out, f))]
+        print(f"   Found {len(files)} tokenizer/manifest files")
+
+        if args.measure:
+            print("\n3. Measuring load time and peak RSS per variant...")
+            measure_artifacts(args.out)
+
+        print("\n" + "=" * 60)
+        print("🎉 SUCCESS! Model is ready to use.")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        print("\n💡 Solutions:")
+        print("1. Update transformers: pip install --upgrade transformers")
+        print("2. Install flash-attention: pip install flash-attn --no-build-isolation")
+        print("3. Or download manually from huggingface.co/microsoft/phi-3-mini-4k-instruct")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from src.ann_index import IVFIndex
+from src.retriever import Retriever
+
+
+NUM_CHUNKS = 200_000
+DIM = 384
+NUM_TOPICS = 2_000   # synthetic clusters, like passages about shared topics
+NUM_QUERIES = 200
+TOP_K = 10
+NPROBES = [1, 4, 8, 16, 32, 64]
+
+
+def synthetic_embeddings(rng):
+    topics = rng.standard_normal((NUM_TOPICS, DIM), dtype=np.float32)
+    labels = rng.integers(0, NUM_TOPICS, NUM_CHUNKS)
+    vectors = topics[labels] + 1.5 * rng.standard_normal((NUM_CHUNKS, DIM), dtype=np.float32)
+    queries = vectors[rng.choice(NUM_CHUNKS, NUM_QUERIES, replace=False)]
+    queries = queries + 0.5 * rng.standard_normal(queries.shape, dtype=np.float32)
+    return vectors, queries
+
+
+def unit(vectors):
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10)
+
+
+def run():
+    rng = np.random.default_rng(0)
+    vectors, queries = synthetic_embeddings(rng)
+
+    exact = Retriever(embedder=None, index_type="exact")
+    exact.build_index([""] * NUM_CHUNKS, vectors)
+    query_vecs = unit(queries)
+
+    start = time.perf_counter()
+    truth = [exact._top_k(exact._scores(q), TOP_K) for q in query_vecs]
+    exact_qps = NUM_QUERIES / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    ivf = IVFIndex()
+    ivf.train(exact.embeddings)
+    ivf.add(exact.embeddings)
+    build_seconds = time.perf_counter() - start
+
+    print(f"\n{NUM_CHUNKS} chunks x {DIM} dims, {len(ivf.centroids)} lists, built in {build_seconds:.1f}s")
+    print(f"{'index':>12} | {f'recall@{TOP_K}':>9} | {'QPS':>8}")
+    print("-" * 36)
+    print(f"{'exact':>12} | {1.0:>9.3f} | {exact_qps:>8.1f}")
+
+    for nprobe in NPROBES:
+        start = time.perf_counter()
+        found, _ = ivf.search(exact.embeddings, query_vecs, TOP_K, nprobe=nprobe)
+        qps = NUM_QUERIES / (time.perf_counter() - start)
+
+        recall = np.mean([
+            len(set(f.tolist()) & set(t.tolist())) / TOP_K for f, t in zip(found, truth)
+        ])
+        print(f"{f'ivf/{nprobe}':>12} | {recall:>9.3f} | {qps:>8.1f}")
+
+
+if __name__ == "__main__":
+    run()
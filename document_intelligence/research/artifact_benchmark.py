@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.model_artifacts import prepare_artifacts, measure_artifacts, choose_variant, read_manifest
+
+
+# A tiny causal LM keeps the check fast on CPU; pass MODEL_NAME to measure Phi-3 itself
+MODEL = sys.argv[1] if len(sys.argv) > 1 else "sshleifer/tiny-gpt2"
+VARIANTS = ["fp32", "bf16", "int8"]
+
+
+def run():
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        manifest = prepare_artifacts(MODEL, artifact_dir, variants=VARIANTS)
+        measurements = measure_artifacts(artifact_dir)
+
+        print(f"\n{MODEL}: each variant loaded on CPU in a fresh process")
+        print(f"{'variant':>8} | {'disk MB':>8} | {'load s':>7} | {'peak RSS MB':>11} | {'baseline MB':>11}")
+        print("-" * 58)
+        for variant in VARIANTS:
+            info = manifest["variants"][variant]
+            m = measurements.get(variant, {})
+            print(f"{variant:>8} | {info['bytes'] / 1e6:>8.1f} | {m.get('load_seconds', float('nan')):>7.2f} | "
+                  f"{m.get('peak_rss_mb') or 0:>11.1f} | {m.get('baseline_rss_mb') or 0:>11.1f}")
+
+        print(f"\nQAModel would load on this host: {choose_variant(read_manifest(artifact_dir), 'cpu')}")
+
+
+if __name__ == "__main__":
+    run()
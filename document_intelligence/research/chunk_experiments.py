@@ -1,44 +1,104 @@
 import os
+import time
+from itertools import product
+
+import numpy as np
+
 from src.pipeline import DocumentPipeline
 from research.neptune_monitor import NeptuneMonitor
 from research.test_cases import TEST_PDFS, TEST_QUESTIONS
 
 
 CHUNK_SIZES = [100, 200, 400, 800]
+CHUNK_OVERLAPS = [0, 50]
+
+
+class ChunkSweepRunner:
+    """Re-chunks documents for a grid of settings against one loaded pipeline.
+
+    Models are loaded once, each document is segmented into sentences once,
+    and only chunk texts that have not been embedded before are encoded.
+    """
+
+    def __init__(self, pipeline: DocumentPipeline = None):
+        self.pipeline = pipeline or DocumentPipeline(answer_cache=False)
+        self.embedding_cache = {}
+        self.stats = {"embedded": 0, "reused": 0}
+
+    def sweep(self, file_path: str, grid):
+        """Yield (chunk_size, overlap, info) after configuring the pipeline for each grid point"""
+        start = time.perf_counter()
+        text, metadata = self.pipeline.loader.load_document(file_path)
+        segmentation = self.pipeline.chunker.sentence_chunker.segment(text)
+        print(f"✂️ Segmented {len(segmentation)} sentences in {time.perf_counter() - start:.2f}s")
+
+        # Vectors are only reusable within one document
+        self.embedding_cache = {}
+        self.pipeline.current_doc = file_path
+        self.pipeline.current_text = segmentation.text
+
+        for chunk_size, overlap in grid:
+            start = time.perf_counter()
+            chunks = self._rechunk(segmentation, chunk_size, overlap)
+            yield chunk_size, overlap, {
+                "chunks": len(chunks),
+                "rechunk_time": round(time.perf_counter() - start, 3),
+                "metadata": metadata,
+            }
+
+    def _rechunk(self, segmentation, chunk_size, overlap):
+        chunker = self.pipeline.chunker.sentence_chunker
+        chunks = chunker.texts(segmentation, chunker.chunk(segmentation, chunk_size, overlap))
+
+        missing = [c for c in dict.fromkeys(chunks) if c not in self.embedding_cache]
+        if missing:
+            vectors = self.pipeline.embedder.embed_chunks(missing)
+            self.embedding_cache.update(zip(missing, vectors))
+        self.stats["embedded"] += len(missing)
+        self.stats["reused"] += len(chunks) - len(missing)
+
+        if chunks:
+            embeddings = np.stack([self.embedding_cache[c] for c in chunks])
+            self.pipeline.set_index(chunks, embeddings)
+        else:
+            self.pipeline.set_index([], None)
+        return chunks
 
 
 class ChunkExperiment:
     def __init__(self):
+        self.runner = ChunkSweepRunner()
         self.monitor = NeptuneMonitor(experiment_name="chunk_size_experiment")
 
     def run(self):
-        for chunk_size in CHUNK_SIZES:
-            print(f"\n🧩 Testing chunk size: {chunk_size}")
-
-            pipeline = DocumentPipeline()
-            pipeline.chunker.fixed_chunk_size = chunk_size  # override adaptive chunking
+        grid = list(product(CHUNK_SIZES, CHUNK_OVERLAPS))
 
-            for pdf in TEST_PDFS:
-                if not os.path.exists(pdf):
-                    continue
+        for pdf in TEST_PDFS:
+            if not os.path.exists(pdf):
+                continue
 
-                doc_info = pipeline.upload_document(pdf)
+            for chunk_size, overlap, info in self.runner.sweep(pdf, grid):
+                print(f"\n🧩 Testing chunk size: {chunk_size}, overlap: {overlap} "
+                      f"({info['chunks']} chunks, {info['rechunk_time']}s)")
 
-                for q in TEST_QUESTIONS:
-                    answer, chunks, _ = pipeline.chat(q)
+                self.monitor.log_experiment_params({
+                    "chunk_size_tested": chunk_size,
+                    "overlap_tested": overlap,
+                    "file": os.path.basename(pdf),
+                })
 
-                    self.monitor.log_experiment_params({
-                        "chunk_size_tested": chunk_size,
-                        "file": os.path.basename(pdf),
-                    })
+                results = self.runner.pipeline.chat_batch(TEST_QUESTIONS)
 
+                for q, (answer, chunks, _) in zip(TEST_QUESTIONS, results):
                     self.monitor.log_question(
                         question=q,
                         answer=answer,
                         retrieved_chunks=chunks,
-                        debug_info={"chunk_size": chunk_size}
+                        debug_info={"chunk_size": chunk_size, "overlap": overlap}
                     )
 
+        print(f"\n📊 Chunk embeddings: {self.runner.stats['embedded']} encoded, "
+              f"{self.runner.stats['reused']} reused")
         self.monitor.stop()
 
 
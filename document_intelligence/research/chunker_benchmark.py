@@ -0,0 +1,94 @@
+import os
+import random
+import re
+import sys
+import time
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from nltk.tokenize import sent_tokenize
+
+from src.sentence_chunker import SentenceChunker
+
+
+TEXT_SIZES = [1_000_000, 4_000_000]
+CHUNK_SIZE = 300
+OVERLAP = 50
+
+WORDS = (
+    "the mercy of god was shown to sister faustina in her diary and many "
+    "visions followed over several years in poland during 1931 near krakow"
+).split()
+
+
+def generate_text(size, seed=7):
+    rng = random.Random(seed)
+    sentences = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 40)))
+        sentence = sentence.capitalize() + rng.choice([".", ".", "?", "!", ".\n\n"])
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def legacy_chunk_text(text, chunk_size, overlap):
+    """The previous AdaptiveChunker.chunk_text: re-tokenises every closed chunk"""
+    text = re.sub(r'\s+', ' ', text).strip()
+    chunks = []
+    current_chunk = ""
+
+    for sentence in sent_tokenize(text):
+        if len(current_chunk) + len(sentence) > chunk_size and current_chunk:
+            chunks.append(current_chunk.strip())
+            overlap_text = ""
+            overlap_sentences = []
+            for s in reversed(sent_tokenize(current_chunk)):
+                if len(overlap_text) + len(s) <= overlap:
+                    overlap_sentences.insert(0, s)
+                    overlap_text = s + " " + overlap_text
+                else:
+                    break
+            current_chunk = " ".join(overlap_sentences + [sentence])
+        else:
+            current_chunk += " " + sentence if current_chunk else sentence
+
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+    return chunks
+
+
+def run():
+    chunker = SentenceChunker()
+
+    print(f"{'chars':>10} | {'legacy s':>9} | {'segment s':>9} | {'pack s':>7} | {'speedup':>7} | same")
+    print("-" * 62)
+
+    for size in TEXT_SIZES:
+        text = generate_text(size)
+
+        start = time.perf_counter()
+        legacy = legacy_chunk_text(text, CHUNK_SIZE, OVERLAP)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        segmentation = chunker.segment(text)
+        segment_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        spans = chunker.chunk(segmentation, CHUNK_SIZE, OVERLAP)
+        pack_seconds = time.perf_counter() - start
+
+        same = legacy == chunker.texts(segmentation, spans)
+        speedup = legacy_seconds / (segment_seconds + pack_seconds)
+        print(f"{len(text):>10} | {legacy_seconds:>9.2f} | {segment_seconds:>9.2f} | "
+              f"{pack_seconds:>7.3f} | {speedup:>6.1f}x | {same}")
+
+    # Segmentation is shared, so extra chunk configurations only pay the packing cost
+    print(f"\nRe-chunking at another size reuses the segmentation: {pack_seconds:.3f}s per config")
+
+
+if __name__ == "__main__":
+    run()
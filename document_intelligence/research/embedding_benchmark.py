@@ -0,0 +1,63 @@
+import os
+import random
+import sys
+import time
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from config import EMBEDDING_MODEL
+from src.embeddings import EmbeddingModel
+
+
+NUM_CHUNKS = 2_000
+BATCH_SIZES = [16, 32, 64]
+BACKENDS = ["torch", "int8"]
+
+WORDS = (
+    "mercy grace soul diary vision sister convent prayer trust jesus "
+    "heaven suffering love faith chapter message theme document resume skills"
+).split()
+
+
+def generate_chunks(count, seed=11):
+    """Chunks of mixed lengths, like real adaptive chunks"""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 150)))
+        for _ in range(count)
+    ]
+
+
+def normalise(vectors):
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10)
+
+
+def run():
+    chunks = generate_chunks(NUM_CHUNKS)
+    reference = None
+
+    print(f"{'backend':>7} | {'batch':>5} | {'chunks/sec':>10} | {'mean cos':>8} | {'min cos':>8}")
+    print("-" * 52)
+
+    for backend in BACKENDS:
+        model = EmbeddingModel(EMBEDDING_MODEL, use_cache=False, device="cpu", backend=backend)
+        model.embed(chunks[:32])  # warm-up
+
+        for batch_size in BATCH_SIZES:
+            model.batch_size = batch_size
+            start = time.perf_counter()
+            vectors = normalise(model.embed(chunks))
+            rate = len(chunks) / (time.perf_counter() - start)
+
+            if reference is None:
+                reference = vectors
+            agreement = np.sum(vectors * reference, axis=1)
+            print(f"{backend:>7} | {batch_size:>5} | {rate:>10.1f} | "
+                  f"{agreement.mean():>8.4f} | {agreement.min():>8.4f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -13,7 +13,8 @@ from research.test_cases import DOCUMENT_TEST_CASES, TEST_PDFS
 
 class RAGExperimentRunner:
     def __init__(self):
-        self.pipeline = DocumentPipeline()
+        # No answer cache: prompt variants of one question must each be answered and timed
+        self.pipeline = DocumentPipeline(answer_cache=False)
         self.monitor = NeptuneMonitor(experiment_name="rag_document_wise_testing")
 
         # Store results for Excel
@@ -48,13 +49,14 @@ class RAGExperimentRunner:
             prompts = test_config["prompts"]
 
             for prompt in prompts:
-                for q in questions:
-                    final_question = f"{prompt} {q}"
+                final_questions = [f"{prompt} {q}" for q in questions]
 
-                    start_time = time.time()
-                    answer, chunks, debug_info = self.pipeline.chat(final_question)
-                    response_time = round(time.time() - start_time, 3)
+                # Retrieve and generate for the whole question set at once; the cost is shared evenly
+                start_time = time.time()
+                responses = self.pipeline.chat_batch(final_questions)
+                response_time = round((time.time() - start_time) / max(len(final_questions), 1), 3)
 
+                for q, final_question, (answer, chunks, debug_info) in zip(questions, final_questions, responses):
                     debug_info = debug_info or {}
 
                     # Save result for Excel
@@ -68,6 +70,7 @@ class RAGExperimentRunner:
                         "Chunk Size": doc_info["chunk_size"],
                         "Response Time (s)": response_time,
                         "Model Used": debug_info.get("model", "unknown"),
+                        "Answer Cache": debug_info.get("answer_cache"),
                     })
 
                     # Log to Neptune
@@ -81,6 +84,7 @@ class RAGExperimentRunner:
                             "response_time": response_time,
                             "chunks_used": len(chunks),
                             "model": debug_info.get("model", "unknown"),
+                            "answer_cache": debug_info.get("answer_cache"),
                         }
                     )
 
@@ -88,6 +92,8 @@ class RAGExperimentRunner:
                     print(f"🤖 A: {answer}")
                     print("-" * 60)
 
+        print(f"\n♻️ Prefix KV cache: {self.pipeline.qa.prefix_cache_stats()}")
+        print(f"⏱️ Generation by query complexity: {self.pipeline.qa.generation_stats()}")
         self.monitor.stop()
         self.save_excel()
 
@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+import time
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import MODEL_NAME, LOCAL_MODEL_PATH
+from src.qa_model import QAModel
+from research.test_cases import TEST_QUESTIONS
+
+
+# Any local causal LM works; a tiny one (e.g. "sshleifer/tiny-gpt2") runs quickly on CPU
+MODEL_PATH = sys.argv[1] if len(sys.argv) > 1 else LOCAL_MODEL_PATH
+NUM_PROMPTS = 32
+BATCH_SIZES = [4, 8, 16]
+
+SENTENCES = [
+    "The diary records visions of Jesus and the message of Divine Mercy.",
+    "She wrote at the request of her confessor while living in the convent.",
+    "Trust, suffering and love are the recurring themes of the text.",
+    "The resume lists skills in Python, machine learning and data analysis.",
+    "Contact details include a phone number and an email address.",
+]
+
+
+def generate_inputs(count, seed=5):
+    """Contexts of 1-12 sentences, so prompt lengths vary like real retrievals"""
+    rng = random.Random(seed)
+    contexts = [" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 12))) for _ in range(count)]
+    questions = [TEST_QUESTIONS[i % len(TEST_QUESTIONS)] for i in range(count)]
+    return contexts, questions
+
+
+def run():
+    qa = QAModel(MODEL_NAME, MODEL_PATH)
+    contexts, questions = generate_inputs(NUM_PROMPTS)
+
+    # Warm up kernels and caches outside the timed runs
+    qa.generate_answers(contexts[:2], questions[:2])
+
+    start = time.perf_counter()
+    for context, question in zip(contexts, questions):
+        qa.generate_answer(context, question)
+    sequential = time.perf_counter() - start
+
+    print(f"\n{NUM_PROMPTS} prompts, \"medium\" generation policy")
+    print(f"{'path':>12} | {'seconds':>8} | {'answers/s':>9} | {'speedup':>7}")
+    print("-" * 46)
+    print(f"{'sequential':>12} | {sequential:>8.2f} | {NUM_PROMPTS / sequential:>9.2f} | {1.0:>6.1f}x")
+
+    for batch_size in BATCH_SIZES:
+        start = time.perf_counter()
+        answers = qa.generate_answers(contexts, questions, batch_size=batch_size)
+        batched = time.perf_counter() - start
+        assert len(answers) == NUM_PROMPTS
+
+        print(f"{f'batch {batch_size}':>12} | {batched:>8.2f} | {NUM_PROMPTS / batched:>9.2f} | "
+              f"{sequential / batched:>6.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+from collections import defaultdict
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import MODEL_NAME, LOCAL_MODEL_PATH
+from src.qa_model import QAModel
+from src.adaptive_chunker import AdaptiveChunker
+from src.generation_policy import GenerationPolicy
+from research.generation_benchmark import generate_inputs
+
+
+# Any local causal LM works; a tiny one (e.g. "sshleifer/tiny-gpt2") runs quickly on CPU
+MODEL_PATH = sys.argv[1] if len(sys.argv) > 1 else LOCAL_MODEL_PATH
+QUESTIONS = [
+    "What is the phone number?",
+    "Who is the author?",
+    "What themes does the diary describe in the convent years?",
+    "Which skills are listed and where were they used?",
+    "Explain the message of Divine Mercy",
+    "Summarize the document",
+]
+REPEATS = 3
+
+# The previous behaviour: 120 sampled tokens for every question, no stop criteria
+FIXED = {c: {"max_new_tokens": 120, "do_sample": True, "temperature": 0.3}
+         for c in ["simple", "medium", "complex"]}
+
+
+def time_policy(qa, policy, contexts, questions, complexities):
+    qa.policy = policy
+    per_class = defaultdict(list)
+    for context, question, complexity in zip(contexts, questions, complexities):
+        start = time.perf_counter()
+        qa.generate_answer(context, question, complexity)
+        per_class[complexity].append(time.perf_counter() - start)
+    return per_class, policy.summary()
+
+
+def run():
+    qa = QAModel(MODEL_NAME, MODEL_PATH)
+    chunker = AdaptiveChunker()
+
+    questions = QUESTIONS * REPEATS
+    contexts, _ = generate_inputs(len(questions))
+    complexities = [chunker.analyze_query_complexity(q) for q in questions]
+
+    # Warm up kernels and caches outside the timed runs
+    qa.generate_answer(contexts[0], questions[0])
+
+    fixed, fixed_stats = time_policy(qa, GenerationPolicy(FIXED, stop_strings=[]), contexts, questions, complexities)
+    adaptive, adaptive_stats = time_policy(qa, GenerationPolicy(), contexts, questions, complexities)
+
+    print(f"\n{len(questions)} questions, fixed 120 sampled tokens vs per-complexity policy")
+    print(f"{'class':>8} | {'fixed s':>8} | {'fixed tok':>9} | {'policy s':>8} | {'policy tok':>10} | {'speedup':>7}")
+    print("-" * 66)
+    for complexity in ["simple", "medium", "complex"]:
+        if complexity not in fixed:
+            continue
+        fixed_s = sum(fixed[complexity]) / len(fixed[complexity])
+        policy_s = sum(adaptive[complexity]) / len(adaptive[complexity])
+        print(f"{complexity:>8} | {fixed_s:>8.2f} | {fixed_stats[complexity]['mean_generated_tokens']:>9.1f} | "
+              f"{policy_s:>8.2f} | {adaptive_stats[complexity]['mean_generated_tokens']:>10.1f} | "
+              f"{fixed_s / policy_s:>6.1f}x")
+
+    fixed_mean = sum(map(sum, fixed.values())) / len(questions)
+    policy_mean = sum(map(sum, adaptive.values())) / len(questions)
+    print(f"\nMean generation time: {fixed_mean:.2f}s fixed -> {policy_mean:.2f}s with the policy")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import openpyxl
+import pandas as pd
+
+from src.document_loader import DocumentLoader
+
+
+ROW_COUNTS = [1_000, 10_000, 100_000]
+SHEETS = 2
+COLUMNS = ["id", "name", "email", "department", "salary", "joined"]
+
+
+def generate_workbook(path, rows, sheets=SHEETS):
+    """Write a synthetic export with write-only mode so generation stays cheap"""
+    workbook = openpyxl.Workbook(write_only=True)
+    for s in range(sheets):
+        sheet = workbook.create_sheet(f"Sheet{s + 1}")
+        sheet.append(COLUMNS)
+        for i in range(rows):
+            sheet.append([
+                i,
+                f"Employee {i}",
+                f"employee{i}@example.com",
+                f"Dept {i % 17}",
+                30_000 + (i * 37) % 90_000,
+                f"20{10 + i % 15}-0{1 + i % 9}-1{i % 10}",
+            ])
+    workbook.save(path)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chars = fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, chars
+
+
+def pandas_load(path):
+    # Previous behaviour: whole first sheet into a DataFrame, then one big string
+    return len(pd.read_excel(path).to_string(index=False))
+
+
+def streaming_load(loader, path):
+    return sum(len(text) for _, text in loader.iter_pages(path))
+
+
+def run():
+    loader = DocumentLoader()
+
+    print(f"{'rows/sheet':>10} | {'method':>9} | {'seconds':>8} | {'peak MB':>8} | {'chars':>11}")
+    print("-" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in ROW_COUNTS:
+            path = os.path.join(tmp, f"export_{rows}.xlsx")
+            generate_workbook(path, rows)
+
+            for method, fn in [
+                ("pandas", lambda: pandas_load(path)),
+                ("streaming", lambda: streaming_load(loader, path)),
+            ]:
+                seconds, peak, chars = measure(fn)
+                print(f"{rows:>10} | {method:>9} | {seconds:>8.2f} | {peak / 1e6:>8.1f} | {chars:>11}")
+
+    print("\nNote: pandas reads only the first sheet; streaming reads all sheets.")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from src.pq_codec import PQIndex
+from src.retriever import Retriever
+from research.ann_benchmark import synthetic_embeddings, unit, NUM_QUERIES, DIM
+
+
+NUM_CHUNKS = 200_000
+TOP_K = 10
+CODE_SIZES = [8, 16, 32, 48, 96]   # bytes per chunk (sub-vectors)
+RERANK = 100
+
+
+def recall(found, truth):
+    return np.mean([len(set(f.tolist()) & set(t.tolist())) / TOP_K for f, t in zip(found, truth)])
+
+
+def run():
+    rng = np.random.default_rng(0)
+    vectors, queries = synthetic_embeddings(rng)
+    vectors = vectors[:NUM_CHUNKS]
+
+    exact = Retriever(embedder=None, index_type="exact", mode="dense")
+    exact.build_index([""] * len(vectors), vectors)
+    query_vecs = unit(queries)
+    truth, _ = exact._search(query_vecs, TOP_K)
+
+    full_mb = exact.embeddings.nbytes / 1e6
+    print(f"\n{len(vectors)} chunks x {DIM} dims, float32 index: {full_mb:.1f} MB")
+    print(f"{'code':>6} | {'RAM MB':>7} | {'saved':>6} | {'train s':>7} | "
+          f"{'recall ADC':>10} | {f'recall +rerank {RERANK}':>18} | {'QPS':>7}")
+    print("-" * 80)
+
+    for m in CODE_SIZES:
+        index = PQIndex(m=m, rerank=RERANK)
+        start = time.perf_counter()
+        index.train(exact.embeddings)
+        index.add(exact.embeddings)
+        train_seconds = time.perf_counter() - start
+
+        # ADC only: rerank nothing beyond the top-k themselves
+        approx = index.codec.adc_scores(index.codes_t, index.codec.lookup_tables(query_vecs))
+        adc_found = [np.argsort(-approx[:, i])[:TOP_K] for i in range(len(query_vecs))]
+
+        start = time.perf_counter()
+        found, _ = index.search(exact.embeddings, query_vecs, TOP_K)
+        qps = NUM_QUERIES / (time.perf_counter() - start)
+
+        ram_mb = index.memory_bytes() / 1e6
+        print(f"{f'{m}B':>6} | {ram_mb:>7.1f} | {full_mb / ram_mb:>5.1f}x | {train_seconds:>7.1f} | "
+              f"{recall(adc_found, truth):>10.3f} | {recall(found, truth):>18.3f} | {qps:>7.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -5,7 +5,8 @@ from research.test_cases import TEST_PDFS, TEST_QUESTIONS, PROMPTS
 
 class PromptExperiment:
     def __init__(self):
-        self.pipeline = DocumentPipeline()
+        # No answer cache: each prompt variant must be answered on its own
+        self.pipeline = DocumentPipeline(answer_cache=False)
         self.monitor = NeptuneMonitor(experiment_name="prompt_experiment")
 
     def run(self):
@@ -13,16 +14,15 @@ class PromptExperiment:
             self.pipeline.upload_document(pdf)
 
             for prompt in PROMPTS:
-                for q in TEST_QUESTIONS:
-                    modified_question = f"{prompt} {q}"
-
-                    answer, chunks, _ = self.pipeline.chat(modified_question)
+                modified_questions = [f"{prompt} {q}" for q in TEST_QUESTIONS]
+                results = self.pipeline.chat_batch(modified_questions)
 
+                for modified_question, (answer, chunks, debug_info) in zip(modified_questions, results):
                     self.monitor.log_question(
                         question=modified_question,
                         answer=answer,
                         retrieved_chunks=chunks,
-                        debug_info={"prompt": prompt}
+                        debug_info={"prompt": prompt, "answer_cache": (debug_info or {}).get("answer_cache")}
                     )
 
         self.monitor.stop()
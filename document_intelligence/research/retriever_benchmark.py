@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from src.retriever import Retriever
+
+
+SIZES = [10_000, 100_000, 1_000_000]
+DIM = 384  # all-MiniLM-L6-v2
+TOP_K = 5
+QUERIES = 20
+
+
+class RandomQueryEmbedder:
+    """Stands in for the embedding model so only index work is timed"""
+
+    def __init__(self, dim, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.dim = dim
+
+    def embed(self, texts):
+        return self.rng.standard_normal((len(texts), self.dim)).astype(np.float32)
+
+
+def legacy_search(embeddings, query_vec, top_k):
+    """The previous per-query path: re-normalise the matrix, then a full argsort"""
+    scores = np.dot(embeddings, query_vec) / (
+        np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_vec) + 1e-10
+    )
+    return np.argsort(scores)[-top_k:][::-1]
+
+
+def per_query_ms(fn):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        fn()
+    return (time.perf_counter() - start) / QUERIES * 1000
+
+
+def run():
+    rng = np.random.default_rng(42)
+
+    print(f"{'chunks':>9} | {'mode':>8} | {'ms/query':>9} | {'index MB':>9} | top-k match")
+    print("-" * 58)
+
+    for size in SIZES:
+        embeddings = rng.standard_normal((size, DIM), dtype=np.float32)
+        query_vec = rng.standard_normal(DIM, dtype=np.float32)
+        expected = legacy_search(embeddings, query_vec, TOP_K)
+
+        ms = per_query_ms(lambda: legacy_search(embeddings, query_vec, TOP_K))
+        print(f"{size:>9} | {'legacy':>8} | {ms:>9.2f} | {embeddings.nbytes / 1e6:>9.1f} | -")
+
+        chunks = [""] * size
+        for dtype in ["float32", "float16"]:
+            retriever = Retriever(RandomQueryEmbedder(DIM), dtype=dtype)
+            retriever.build_index(chunks, embeddings)
+            unit_query = query_vec / np.linalg.norm(query_vec)
+
+            def search():
+                return retriever._top_k(retriever._scores(unit_query), TOP_K)
+
+            ms = per_query_ms(search)
+            match = list(search()) == list(expected)
+            print(f"{size:>9} | {dtype:>8} | {ms:>9.2f} | "
+                  f"{retriever.embeddings.nbytes / 1e6:>9.1f} | {match}")
+
+        del embeddings
+
+
+if __name__ == "__main__":
+    run()
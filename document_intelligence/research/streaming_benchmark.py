@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+# ✅ Fix Python path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import MODEL_NAME, LOCAL_MODEL_PATH
+from src.qa_model import QAModel
+
+
+# Any local causal LM works; a tiny one (e.g. "sshleifer/tiny-gpt2") checks streaming on CPU
+MODEL_PATH = sys.argv[1] if len(sys.argv) > 1 else LOCAL_MODEL_PATH
+RUNS = 3
+
+CONTEXT = (
+    "The Diary of Saint Faustina describes her visions of Jesus and the message of Divine Mercy. "
+    "She wrote the diary in the convent at the request of her confessor, recording prayers, "
+    "conversations and reflections on trust, suffering and love."
+)
+QUESTION = "Why did she write the diary?"
+
+
+def run():
+    qa = QAModel(MODEL_NAME, MODEL_PATH)
+
+    print(f"\n{'run':>4} | {'blocking s':>10} | {'first token s':>13} | {'streamed s':>10} | {'deltas':>6}")
+    print("-" * 56)
+
+    for i in range(RUNS):
+        start = time.perf_counter()
+        blocking_answer = qa.generate_answer(CONTEXT, QUESTION)
+        blocking = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first_token = None
+        deltas = []
+        for delta in qa.stream_answer(CONTEXT, QUESTION):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            deltas.append(delta)
+        streamed = time.perf_counter() - start
+
+        print(f"{i + 1:>4} | {blocking:>10.2f} | {first_token or 0:>13.2f} | {streamed:>10.2f} | {len(deltas):>6}")
+
+    print(f"\nBlocking answer: {blocking_answer[:200]}")
+    print(f"Streamed answer: {''.join(deltas)[:200]}")
+    # Every run after the first reuses the prefilled header + context
+    print(f"Prefix cache: {qa.prefix_cache_stats()}")
+
+
+if __name__ == "__main__":
+    run()
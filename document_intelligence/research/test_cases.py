@@ -71,3 +71,17 @@ TEST_PDFS = [
     # "C:/Users/Ruffina/Downloads/Kishor S_2262097_Michaung.pdf",
     "C:/Users/Ruffina/Desktop/Divine mercy/divine-mercy-in-my-soul c1.pdf"
 ]
+
+# Generic questions/prompts used by the cross-document experiments
+TEST_QUESTIONS = [
+    "What is this document about?",
+    "What is the main theme?",
+    "Summarize the document",
+    "What is 2+2?"  # negative test
+]
+
+PROMPTS = [
+    "Answer using the document only.",
+    "Explain simply.",
+    "Summarize clearly."
+]
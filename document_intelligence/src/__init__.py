@@ -2,9 +2,25 @@
 
 __all__ = [
     "document_loader",
+    "ocr_engine",
+    "sentence_chunker",
     "adaptive_chunker",
+    "model_registry",
+    "embedding_cache",
     "embeddings",
+    "ann_index",
+    "pq_codec",
+    "pca_index",
+    "lexical_index",
     "retriever",
+    "ingestion_cache",
+    "corpus_index",
+    "prefix_cache",
+    "model_artifacts",
+    "entity_index",
+    "context_packer",
+    "generation_policy",
+    "answer_cache",
     "qa_model",
     "pdf_highlighter",
     "pipeline",
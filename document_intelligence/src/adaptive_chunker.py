@@ -1,9 +1,10 @@
-import re
-from typing import List
+from typing import Iterable, Iterator, List, Tuple
 import nltk
 from nltk.tokenize import sent_tokenize
 import os
 
+from src.sentence_chunker import ChunkSpan, SentenceChunker, SentenceSegmentation
+
 # Download NLTK data if needed
 try:
     nltk.data.find('tokenizers/punkt')
@@ -15,9 +16,23 @@ class AdaptiveChunker:
         self.min_chunk_size = 100
         self.max_chunk_size = 1000
         self.target_chunk_size = 300
+        self.fixed_chunk_size = None  # when set, overrides the adaptive size
+        self.sentence_chunker = SentenceChunker()
+
+    def settings(self) -> dict:
+        """Tunables that change the chunks produced"""
+        return {
+            "min_chunk_size": self.min_chunk_size,
+            "max_chunk_size": self.max_chunk_size,
+            "target_chunk_size": self.target_chunk_size,
+            "fixed_chunk_size": self.fixed_chunk_size,
+        }
         
     def calculate_chunk_size(self, text: str, file_size: int = None, query_complexity: str = "medium") -> int:
         """Dynamically calculate chunk size based on document and query"""
+        if self.fixed_chunk_size:
+            return int(self.fixed_chunk_size)
+
         # Base on file size
         if file_size:
             if file_size < 100_000:  # Small file
@@ -47,53 +62,53 @@ class AdaptiveChunker:
         # Apply limits
         return int(max(self.min_chunk_size, min(self.max_chunk_size, chunk_size)))
     
-    def chunk_text(self, text: str, chunk_size: int = None, overlap: int = 50) -> List[str]:
-        """Chunk text with semantic boundaries"""
-        if not chunk_size:
-            chunk_size = self.target_chunk_size
-            
-        # Clean text
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Split by sentences
-        sentences = sent_tokenize(text)
-        
-        chunks = []
-        current_chunk = ""
-        
-        for sentence in sentences:
-            # If adding this sentence would exceed chunk size and current chunk is not empty
-            if len(current_chunk) + len(sentence) > chunk_size and current_chunk:
-                chunks.append(current_chunk.strip())
-                # Start new chunk with overlap from previous chunk
-                overlap_sentences = self._get_overlap_sentences(current_chunk, overlap)
-                current_chunk = " ".join(overlap_sentences + [sentence])
-            else:
-                current_chunk += " " + sentence if current_chunk else sentence
-        
-        # Add the last chunk if not empty
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-        
-        print(f"[INFO] Created {len(chunks)} adaptive chunks (target size: {chunk_size})")
+    def chunk_text(self, text: str, chunk_size: int = None, overlap: int = 50, with_starts: bool = False):
+        """Chunk text with semantic boundaries.
+
+        With ``with_starts``, returns (chunks, offsets of the chunks in the
+        whitespace-normalised text).
+        """
+        segmentation, spans = self.chunk_spans(text, chunk_size, overlap)
+        chunks = self.sentence_chunker.texts(segmentation, spans)
+        
+        print(f"[INFO] Created {len(chunks)} adaptive chunks (target size: {chunk_size or self.target_chunk_size})")
+        if with_starts:
+            return chunks, [span.start for span in spans]
         return chunks
     
-    def _get_overlap_sentences(self, text: str, overlap_chars: int) -> List[str]:
-        """Get sentences for overlap from end of chunk"""
-        sentences = sent_tokenize(text)
-        overlap_text = ""
-        overlap_sentences = []
-        
-        # Add sentences from the end until we reach overlap size
-        for sentence in reversed(sentences):
-            if len(overlap_text) + len(sentence) <= overlap_chars:
-                overlap_sentences.insert(0, sentence)
-                overlap_text = sentence + " " + overlap_text
-            else:
-                break
+    def chunk_spans(self, text: str, chunk_size: int = None,
+                    overlap: int = 50) -> Tuple[SentenceSegmentation, List[ChunkSpan]]:
+        """Chunk text into character spans over its cleaned form.
+
+        The text is segmented into sentences once; chunks and overlaps are
+        index ranges over those offsets, so nothing is re-tokenised.
+        """
+        if not chunk_size:
+            chunk_size = self.target_chunk_size
         
-        return overlap_sentences
+        segmentation = self.sentence_chunker.segment(text)
+        return segmentation, self.sentence_chunker.chunk(segmentation, chunk_size, overlap)
     
+    def iter_chunks(self, pages: Iterable[Tuple[int, str]], chunk_size: int = None,
+                    overlap: int = 50) -> Iterator[Tuple[str, int, int]]:
+        """Chunk (page_number, text) pairs incrementally, yielding (chunk, page_number, start).
+
+        Uses the same sentence segmentation and packing as ``chunk_text``, so
+        a streamed document gets the same chunks as a fully loaded one; only
+        the sentences of the chunk being built are kept in memory. A chunk is
+        attributed to the page it starts on; ``start`` is its offset in the
+        pages' joined, whitespace-normalised text.
+        """
+        if not chunk_size:
+            chunk_size = self.target_chunk_size
+
+        count = 0
+        for chunk, page_number, start in self.sentence_chunker.stream(pages, chunk_size, overlap):
+            count += 1
+            yield chunk, page_number, start
+
+        print(f"[INFO] Streamed {count} adaptive chunks (target size: {chunk_size})")
+
     def analyze_query_complexity(self, query: str) -> str:
         """Analyze query complexity to adjust chunking"""
         query = query.lower()
@@ -0,0 +1,152 @@
+import numpy as np
+from typing import Tuple
+
+from config import IVF_NLIST, IVF_NPROBE, IVF_MIN_TRAIN_SIZE
+
+# Rows assigned to centroids per block, to bound the temporary score matrix
+_ASSIGN_BLOCK = 8_192
+
+
+class IVFIndex:
+    """Inverted-file ANN index over a Retriever's unit-length vectors.
+
+    Training clusters the vectors with spherical k-means into ``nlist`` lists;
+    a query only scores the vectors in its ``nprobe`` closest lists. The index
+    stores centroids and list assignments only; vectors stay in the Retriever.
+    Raising ``nprobe`` trades latency for recall (``nprobe == nlist`` is exact).
+    """
+
+    def __init__(self, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE,
+                 min_train_size: int = IVF_MIN_TRAIN_SIZE, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        self.centroids = None
+        self.assignments = np.empty(0, dtype=np.int32)  # entries in use of _buffer
+        self._buffer = None
+        self._order = None
+        self._offsets = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    # ================= TRAINING ================= #
+    def train(self, vectors: np.ndarray, iterations: int = 10):
+        """Learn ``nlist`` centroids (default ~4*sqrt(n)) from a sample of ``vectors``"""
+        n = len(vectors)
+        nlist = self.nlist or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, max(nlist * 64, 10_000))
+        sample = np.asarray(vectors[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._assign(sample, centroids)
+            counts = np.bincount(assign, minlength=nlist)
+
+            order = np.argsort(assign, kind="stable")
+            nonempty = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[nonempty]
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+
+            centroids[nonempty] = sums
+            # Re-seed empty lists from random sample points
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-10
+
+        self.centroids = centroids
+        self.assignments = np.empty(0, dtype=np.int32)
+        self._buffer = None
+        self._order = None
+        print(f"🧭 IVF index trained: {nlist} lists from {sample_size} vectors")
+
+    def add(self, vectors: np.ndarray):
+        """Assign newly appended vectors (in Retriever order) to their lists"""
+        assign = self._assign(vectors, self.centroids)
+        count = len(self.assignments)
+        needed = count + len(assign)
+
+        # Grow geometrically so appending batch after batch stays linear overall
+        if self._buffer is None or needed > len(self._buffer):
+            buffer = np.empty(max(needed, 2 * count, 1024), dtype=np.int32)
+            buffer[:count] = self.assignments
+            self._buffer = buffer
+
+        self._buffer[count:needed] = assign
+        self.assignments = self._buffer[:needed]
+        self._order = None
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assign = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), _ASSIGN_BLOCK):
+            block = np.asarray(vectors[start:start + _ASSIGN_BLOCK], dtype=np.float32)
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return assign
+
+    def _lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Vector ids grouped by list (CSR layout), rebuilt lazily after adds"""
+        if self._order is None:
+            self._order = np.argsort(self.assignments, kind="stable").astype(np.int64)
+            counts = np.bincount(self.assignments, minlength=len(self.centroids))
+            self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        return self._order, self._offsets
+
+    # ================= SEARCH ================= #
+    def search(self, vectors: np.ndarray, query_vecs: np.ndarray, top_k: int,
+               nprobe: int = None) -> Tuple[list, list]:
+        """Approximate top-k for each unit-length query row; returns per-query (ids, scores)"""
+        order, offsets = self._lists()
+        nprobe = max(1, min(nprobe or self.nprobe, len(self.centroids)))
+
+        centroid_scores = query_vecs @ self.centroids.T
+        if nprobe < len(self.centroids):
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(len(self.centroids)), centroid_scores.shape)
+
+        all_ids, all_scores = [], []
+        for query_vec, lists in zip(query_vecs, probes):
+            candidates = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in lists])
+            if len(candidates) == 0:
+                all_ids.append(np.empty(0, dtype=np.int64))
+                all_scores.append(np.empty(0, dtype=np.float32))
+                continue
+
+            scores = np.asarray(vectors[candidates], dtype=np.float32) @ query_vec
+            k = min(top_k, len(scores))
+            best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+            best = best[np.argsort(-scores[best], kind="stable")]
+            all_ids.append(candidates[best])
+            all_scores.append(scores[best])
+
+        return all_ids, all_scores
+
+    # ================= PERSISTENCE ================= #
+    def save(self, path: str):
+        if not self.trained:
+            raise ValueError("Cannot save an untrained IVF index")
+        np.savez(
+            path,
+            centroids=self.centroids,
+            assignments=self.assignments,
+            params=np.array([self.nlist or 0, self.nprobe, self.min_train_size, self.seed]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        data = np.load(path)
+        nlist, nprobe, min_train_size, seed = (int(v) for v in data["params"])
+        index = cls(nlist=nlist or None, nprobe=nprobe, min_train_size=min_train_size, seed=seed)
+        index.centroids = data["centroids"]
+        index.assignments = data["assignments"]
+        return index
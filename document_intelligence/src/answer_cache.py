@@ -0,0 +1,133 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+from config import ANSWER_CACHE_MAX_ITEMS, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY
+
+_TRAILING_PUNCT = re.compile(r"[\s?.!]+$")
+
+
+class AnswerCache:
+    """Chat responses keyed by index scope and question, in two tiers.
+
+    The exact tier matches the normalised question text; the near-duplicate
+    tier compares question embeddings within the same scope against
+    ``similarity``. A scope names one index state (the document's ingestion
+    key, or an index version), so answers never leak across documents or
+    index changes. Entries expire after ``ttl_seconds`` and the least
+    recently used are evicted beyond ``max_items``.
+    """
+
+    def __init__(self, max_items: int = ANSWER_CACHE_MAX_ITEMS, ttl_seconds: float = ANSWER_CACHE_TTL,
+                 similarity: Optional[float] = ANSWER_CACHE_SIMILARITY):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._entries = OrderedDict()  # (scope, normalised question) -> entry
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0,
+                      "expired": 0, "evicted": 0, "invalidated": 0}
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        return _TRAILING_PUNCT.sub("", " ".join(question.lower().split()))
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / (np.linalg.norm(vector) + 1e-10)
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry["created"] > self.ttl_seconds
+
+    def _response(self, entry: dict, tier: str, similarity: float):
+        answer, chunks, debug_info = entry["response"]
+        return answer, list(chunks), {**debug_info, "answer_cache": tier,
+                                      "cache_similarity": round(similarity, 4)}
+
+    def get(self, scope: str, question: str, embed: Callable = None):
+        """(cached (answer, chunks, debug_info) or None, question vector or None).
+
+        ``embed`` maps a question to its embedding; it is only called when
+        the exact tier misses. The vector is returned so ``put`` can store it
+        without embedding the question again.
+        """
+        key = (scope, self.normalize(question))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return self._response(entry, "exact", 1.0), None
+
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if k[0] == scope and e["vector"] is not None and not self._expired(e, now)]
+
+        if embed is None or self.similarity is None:
+            self._miss()
+            return None, None
+
+        query = self._unit(embed(question))
+        if not candidates:
+            self._miss()
+            return None, query
+
+        similarities = np.stack([e["vector"] for _, e in candidates]) @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity:
+            self._miss()
+            return None, query
+
+        best_key, entry = candidates[best]
+        with self._lock:
+            if best_key in self._entries:
+                self._entries.move_to_end(best_key)
+            self.stats["near_hits"] += 1
+        return self._response(entry, "near", float(similarities[best])), query
+
+    def _miss(self):
+        with self._lock:
+            self.stats["misses"] += 1
+
+    def put(self, scope: str, question: str, response, vector=None):
+        """Store a response; ``vector`` (from ``get``) enables the near-duplicate tier for it"""
+        answer, chunks, debug_info = response
+        vector = self._unit(vector) if vector is not None and self.similarity is not None else None
+        key = (scope, self.normalize(question))
+        with self._lock:
+            self._entries[key] = {
+                "response": (answer, list(chunks), dict(debug_info)),
+                "vector": vector,
+                "created": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def invalidate(self, scope: str = None):
+        """Drop the entries of one scope, or every entry"""
+        with self._lock:
+            stale = [k for k in self._entries if scope is None or k[0] == scope]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidated"] += len(stale)
+
+    def summary(self) -> dict:
+        with self._lock:
+            hits = self.stats["exact_hits"] + self.stats["near_hits"]
+            lookups = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            }
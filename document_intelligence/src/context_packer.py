@@ -0,0 +1,121 @@
+import hashlib
+from collections import OrderedDict
+from typing import Callable, List, Tuple
+
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_CACHE_ITEMS
+from src.sentence_chunker import SentenceChunker
+
+
+class ContextPacker:
+    """Packs retrieved chunks into a prompt context under a token budget.
+
+    Chunks are taken in retrieval rank order as whole sentences: sentences
+    already packed from a neighbouring chunk (chunk overlap) are skipped, and
+    sentences that no longer fit are skipped while shorter ones still fill
+    the budget. Only a sentence longer than the whole budget (unpunctuated
+    OCR pages, table blocks) is cut, and only when nothing was packed before
+    it, so the context is never empty. Sentence splits and token counts are
+    cached per text, so repeated chunks cost no re-tokenisation.
+    """
+
+    def __init__(self, count_tokens: Callable[[List[str]], List[int]],
+                 truncate_tokens: Callable[[str, int], str],
+                 budget: int = CONTEXT_TOKEN_BUDGET, sentence_chunker: SentenceChunker = None,
+                 cache_items: int = CONTEXT_CACHE_ITEMS):
+        self.count_tokens = count_tokens
+        self.truncate_tokens = truncate_tokens
+        self.budget = budget
+        self.sentence_chunker = sentence_chunker or SentenceChunker()
+        self.cache_items = cache_items
+        self._sentences = OrderedDict()  # chunk key -> sentences
+        self._tokens = OrderedDict()     # sentence key -> token count
+        self.stats = {"token_cache_hits": 0, "token_cache_misses": 0}
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_items:
+            cache.popitem(last=False)
+
+    def sentences(self, chunk: str) -> List[str]:
+        key = self._key(chunk)
+        cached = self._sentences.get(key)
+        if cached is None:
+            segmentation = self.sentence_chunker.segment(chunk)
+            cached = [segmentation.sentence(i) for i in range(len(segmentation))]
+        self._remember(self._sentences, key, cached)
+        return cached
+
+    def token_counts(self, texts: List[str]) -> List[int]:
+        """Token counts of ``texts``; only uncached texts are tokenised, in one batch"""
+        keys = [self._key(t) for t in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._tokens:
+                missing.setdefault(key, text)
+
+        self.stats["token_cache_misses"] += len(missing)
+        self.stats["token_cache_hits"] += len(texts) - len(missing)
+        if missing:
+            for key, count in zip(missing, self.count_tokens(list(missing.values()))):
+                self._remember(self._tokens, key, count)
+
+        counts = []
+        for key in keys:
+            self._tokens.move_to_end(key)
+            counts.append(self._tokens[key])
+        return counts
+
+    def pack(self, chunks: List[str], budget: int = None) -> Tuple[str, dict]:
+        """Return (context, stats) for chunks in rank order"""
+        budget = budget or self.budget
+        seen = set()
+        parts = []
+        used = 0
+        duplicates = 0
+        over_budget = 0
+        truncated = 0
+        chunks_used = 0
+
+        for chunk in chunks:
+            fresh = []
+            for sentence in self.sentences(chunk):
+                normalized = " ".join(sentence.lower().split())
+                if normalized in seen:
+                    duplicates += 1
+                    continue
+                seen.add(normalized)
+                fresh.append(sentence)
+            if not fresh:
+                continue
+
+            kept = []
+            # Each sentence costs its tokens plus one for the joining space/newline
+            for sentence, tokens in zip(fresh, self.token_counts(fresh)):
+                if used + tokens + 1 <= budget:
+                    kept.append(sentence)
+                    used += tokens + 1
+                elif not parts and not kept:
+                    # Oversize first sentence: its leading tokens beat an empty context
+                    kept.append(self.truncate_tokens(sentence, budget - used - 1))
+                    used = budget
+                    truncated += 1
+                else:
+                    over_budget += 1
+
+            if kept:
+                parts.append(" ".join(kept))
+                chunks_used += 1
+
+        return "\n\n".join(parts), {
+            "context_tokens": used,
+            "context_budget": budget,
+            "chunks_packed": chunks_used,
+            "duplicate_sentences_dropped": duplicates,
+            "sentences_over_budget": over_budget,
+            "sentences_truncated": truncated,
+        }
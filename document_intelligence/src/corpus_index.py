@@ -0,0 +1,344 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from config import CORPUS_DIR, RETRIEVAL_MODE, RRF_CANDIDATES
+from src.lexical_index import BM25Index
+from src.retriever import Retriever
+
+# One fixed-size record per chunk in the side table
+META_DTYPE = np.dtype([
+    ("doc_id", "<i4"),
+    ("page", "<i4"),
+    ("start", "<i8"),        # character span of the chunk within its page
+    ("end", "<i8"),
+    ("text_offset", "<i8"),  # byte range of the chunk text in texts.bin
+    ("text_len", "<i4"),
+])
+
+# Chunks tokenised per step when the BM25 index is rebuilt from texts.bin
+_LEXICAL_REBUILD_BLOCK = 4_096
+
+
+class CorpusIndex:
+    """Persistent multi-document index backed by append-only files.
+
+    ``embeddings.f32`` holds unit-length float32 rows and is memory-mapped for
+    search, ``chunks.meta`` is a packed side table (doc id, page, span, text
+    location) and ``texts.bin`` the UTF-8 chunk texts. ``manifest.json`` is
+    the commit point: a document's rows only count once it is listed there,
+    and any uncommitted tail is truncated when the corpus is reopened.
+
+    Each document occupies a contiguous row range, so filtering by document
+    id scores only those ranges. In "hybrid" mode ``lexical.npz`` holds a BM25
+    index over every committed row, fused with the dense ranking like the
+    single-document Retriever.
+    """
+
+    def __init__(self, embedder, corpus_dir=CORPUS_DIR, mode: str = RETRIEVAL_MODE):
+        if mode not in ("dense", "hybrid"):
+            raise ValueError(f"Unsupported retrieval mode: {mode}")
+        self.embedder = embedder
+        self.mode = mode
+        self.corpus_dir = Path(corpus_dir)
+        self.corpus_dir.mkdir(parents=True, exist_ok=True)
+
+        self._embeddings_path = self.corpus_dir / "embeddings.f32"
+        self._meta_path = self.corpus_dir / "chunks.meta"
+        self._texts_path = self.corpus_dir / "texts.bin"
+        self._manifest_path = self.corpus_dir / "manifest.json"
+        self._lexical_path = self.corpus_dir / "lexical.npz"
+
+        self.manifest = self._load_manifest()
+        self._truncate_uncommitted()
+        self._arrays = None
+        self.lexical = self._load_lexical() if mode == "hybrid" else None
+
+    # ================= MANIFEST ================= #
+    def _load_manifest(self) -> dict:
+        if self._manifest_path.exists():
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"dim": None, "rows": 0, "text_bytes": 0, "dead_rows": 0, "next_id": 1, "documents": {}}
+
+    def _save_manifest(self):
+        tmp_path = self._manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=1, default=str)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _truncate_uncommitted(self):
+        """Drop bytes written by an ingestion that never committed"""
+        dim = self.manifest["dim"] or 0
+        sizes = {
+            self._embeddings_path: self.manifest["rows"] * dim * 4,
+            self._meta_path: self.manifest["rows"] * META_DTYPE.itemsize,
+            self._texts_path: self.manifest["text_bytes"],
+        }
+        for path, size in sizes.items():
+            if not path.exists():
+                path.touch()
+            if path.stat().st_size != size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    # ================= LEXICAL INDEX ================= #
+    def _load_lexical(self) -> BM25Index:
+        """BM25 index of the committed rows, rebuilt from the texts if missing or stale"""
+        if self._lexical_path.exists():
+            lexical = BM25Index.load(self._lexical_path)
+            if len(lexical) == self.manifest["rows"]:
+                return lexical
+        return self._rebuild_lexical()
+
+    def _rebuild_lexical(self) -> BM25Index:
+        lexical = BM25Index()
+        rows = self.manifest["rows"]
+        for start in range(0, rows, _LEXICAL_REBUILD_BLOCK):
+            end = min(rows, start + _LEXICAL_REBUILD_BLOCK)
+            lexical.add([self.chunk_text(row) for row in range(start, end)])
+        self._save_lexical(lexical)
+        if rows:
+            print(f"🔤 Rebuilt corpus BM25 index over {rows} chunks")
+        return lexical
+
+    def _save_lexical(self, lexical: BM25Index):
+        tmp_path = self._lexical_path.with_suffix(".npz.tmp")
+        with open(tmp_path, "wb") as f:
+            lexical.save(f)
+        os.replace(tmp_path, self._lexical_path)
+
+    # ================= DOCUMENTS ================= #
+    def documents(self) -> List[dict]:
+        return [{"doc_id": int(doc_id), **doc} for doc_id, doc in self.manifest["documents"].items()]
+
+    def find_by_hash(self, file_hash: str):
+        for doc_id, doc in self.manifest["documents"].items():
+            if doc["hash"] == file_hash:
+                return int(doc_id)
+        return None
+
+    def add_document(self, name: str, path: str, file_hash: str, batches: Iterable,
+                     metadata: dict = None):
+        """Append a document from (texts, embeddings, pages, spans) batches.
+
+        Batches are written as they arrive, so memory is bounded by the batch
+        size. Returns the new document id, or None if no chunks were produced.
+        """
+        doc_id = self.manifest["next_id"]
+        row_start = rows = self.manifest["rows"]
+        text_bytes = self.manifest["text_bytes"]
+        dim = self.manifest["dim"]
+
+        try:
+            with open(self._embeddings_path, "ab") as f_emb, \
+                    open(self._meta_path, "ab") as f_meta, \
+                    open(self._texts_path, "ab") as f_text:
+                for texts, embeddings, pages, spans in batches:
+                    vectors = np.asarray(embeddings, dtype=np.float32)
+                    vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10)
+                    if dim is None:
+                        dim = vectors.shape[1]
+                    elif vectors.shape[1] != dim:
+                        raise ValueError(f"Embedding dim {vectors.shape[1]} does not match corpus dim {dim}")
+
+                    encoded = [t.encode("utf-8") for t in texts]
+                    lengths = np.array([len(b) for b in encoded], dtype=np.int64)
+
+                    records = np.zeros(len(texts), dtype=META_DTYPE)
+                    records["doc_id"] = doc_id
+                    records["page"] = pages
+                    records["start"] = [span[0] for span in spans]
+                    records["end"] = [span[1] for span in spans]
+                    records["text_offset"] = text_bytes + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+                    records["text_len"] = lengths
+
+                    f_text.write(b"".join(encoded))
+                    f_meta.write(records.tobytes())
+                    f_emb.write(vectors.tobytes())
+                    rows += len(texts)
+                    text_bytes += int(lengths.sum())
+                    if self.lexical is not None:
+                        self.lexical.add(list(texts))
+        except BaseException:
+            self._truncate_uncommitted()
+            if self.lexical is not None:
+                self.lexical = self._load_lexical()
+            raise
+
+        if rows == row_start:
+            return None
+
+        # The BM25 file is written before the manifest commits the rows; a
+        # crash in between leaves it longer than the corpus and it is rebuilt
+        if self.lexical is not None:
+            self._save_lexical(self.lexical)
+        self.manifest.update({"dim": dim, "rows": rows, "text_bytes": text_bytes, "next_id": doc_id + 1})
+        self.manifest["documents"][str(doc_id)] = {
+            "name": name,
+            "path": path,
+            "hash": file_hash,
+            "row_start": row_start,
+            "row_end": rows,
+            "added": time.time(),
+            "metadata": metadata or {},
+        }
+        self._save_manifest()
+        self._arrays = None
+        print(f"📚 Added document {doc_id} ({name}) with {rows - row_start} chunks to corpus")
+        return doc_id
+
+    def remove_document(self, doc_id: int):
+        """Forget a document; its rows are reclaimed once dead rows outnumber live ones"""
+        doc = self.manifest["documents"].pop(str(doc_id), None)
+        if doc is None:
+            return False
+
+        self.manifest["dead_rows"] += doc["row_end"] - doc["row_start"]
+        self._save_manifest()
+        print(f"🗑️ Removed document {doc_id} ({doc['name']}) from corpus")
+
+        if self.manifest["dead_rows"] > self.manifest["rows"] - self.manifest["dead_rows"]:
+            self.compact()
+        return True
+
+    def compact(self):
+        """Rewrite the store keeping only rows of live documents"""
+        vectors, meta, texts = self._open()
+        dim = self.manifest["dim"] or 0
+        tmp = {p: p.with_suffix(p.suffix + ".tmp") for p in
+               (self._embeddings_path, self._meta_path, self._texts_path)}
+
+        rows = 0
+        text_bytes = 0
+        with open(tmp[self._embeddings_path], "wb") as f_emb, \
+                open(tmp[self._meta_path], "wb") as f_meta, \
+                open(tmp[self._texts_path], "wb") as f_text:
+            for doc in self.manifest["documents"].values():
+                start, end = doc["row_start"], doc["row_end"]
+                records = np.array(meta[start:end])
+                first = int(records["text_offset"][0])
+                last = int(records["text_offset"][-1] + records["text_len"][-1])
+
+                f_emb.write(np.ascontiguousarray(vectors[start:end]).tobytes())
+                f_text.write(texts[first:last].tobytes())
+                records["text_offset"] += text_bytes - first
+                f_meta.write(records.tobytes())
+
+                doc["row_start"], doc["row_end"] = rows, rows + (end - start)
+                rows += end - start
+                text_bytes += last - first
+
+        # Release the memory maps before replacing the files underneath them
+        del vectors, meta, texts
+        self._arrays = None
+        for path, tmp_path in tmp.items():
+            os.replace(tmp_path, path)
+
+        self.manifest.update({"rows": rows, "text_bytes": text_bytes, "dead_rows": 0,
+                              "dim": self.manifest["dim"] if rows else None})
+        self._save_manifest()
+        if self.lexical is not None:
+            self.lexical = self._rebuild_lexical()
+        print(f"🧹 Compacted corpus to {rows} chunks ({dim}-dim)")
+
+    # ================= SEARCH ================= #
+    def _open(self):
+        """Memory-map the committed rows (re-opened lazily after writes)"""
+        if self._arrays is None:
+            rows, dim = self.manifest["rows"], self.manifest["dim"]
+            if rows == 0:
+                vectors = np.empty((0, dim or 0), dtype=np.float32)
+                meta = np.empty(0, dtype=META_DTYPE)
+            else:
+                vectors = np.memmap(self._embeddings_path, dtype=np.float32, mode="r", shape=(rows, dim))
+                meta = np.memmap(self._meta_path, dtype=META_DTYPE, mode="r", shape=(rows,))
+            if self.manifest["text_bytes"]:
+                texts = np.memmap(self._texts_path, dtype=np.uint8, mode="r",
+                                  shape=(self.manifest["text_bytes"],))
+            else:
+                texts = np.empty(0, dtype=np.uint8)
+            self._arrays = (vectors, meta, texts)
+        return self._arrays
+
+    def _row_ranges(self, doc_ids=None) -> List[Tuple[int, int]]:
+        """Row ranges of the selected live documents, adjacent ranges merged"""
+        documents = self.manifest["documents"]
+        if doc_ids is None:
+            selected = documents.values()
+        else:
+            selected = [documents[str(d)] for d in doc_ids if str(d) in documents]
+
+        ranges = []
+        for start, end in sorted((d["row_start"], d["row_end"]) for d in selected):
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def search(self, query_vec: np.ndarray, top_k: int = 3, doc_ids=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (rows, scores) for a unit-length query, scanning only the selected documents"""
+        ranges = self._row_ranges(doc_ids)
+        if not ranges:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        vectors, _, _ = self._open()
+        scores = np.concatenate([vectors[start:end] @ query_vec for start, end in ranges])
+        return self._top_rows(ranges, scores, top_k)
+
+    def lexical_search(self, query: str, top_k: int = 3, doc_ids=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k BM25 (rows, scores) among the selected documents' chunks sharing a query term"""
+        ranges = self._row_ranges(doc_ids)
+        if not ranges:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        all_scores = self.lexical.scores(query)
+        scores = np.concatenate([all_scores[start:end] for start, end in ranges])
+        rows, scores = self._top_rows(ranges, scores, top_k)
+        matched = scores > 0
+        return rows[matched], scores[matched]
+
+    @staticmethod
+    def _top_rows(ranges: List[Tuple[int, int]], scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Best ``top_k`` corpus rows given ``scores`` laid out over ``ranges``"""
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return rows[best], scores[best]
+
+    def get_relevant_chunks(self, query: str, top_k: int = 3, doc_ids=None) -> Tuple[List[str], List[float]]:
+        """Dense top-k, or in hybrid mode dense and BM25 rankings fused by reciprocal rank"""
+        query_vec = np.asarray(self.embedder.embed([query])[0], dtype=np.float32)
+        query_vec = query_vec / (np.linalg.norm(query_vec) + 1e-10)
+
+        if self.lexical is None:
+            rows, scores = self.search(query_vec, top_k, doc_ids)
+        else:
+            depth = max(top_k, RRF_CANDIDATES)
+            dense, _ = self.search(query_vec, depth, doc_ids)
+            lexical, _ = self.lexical_search(query, depth, doc_ids)
+            # Lexical ranking first: on equal fused scores an exact term match wins
+            rows, scores = Retriever._fuse([lexical, dense], top_k)
+        return [self.chunk_text(row) for row in rows], [float(s) for s in scores]
+
+    def chunk_text(self, row: int) -> str:
+        _, meta, texts = self._open()
+        offset, length = int(meta[row]["text_offset"]), int(meta[row]["text_len"])
+        return texts[offset:offset + length].tobytes().decode("utf-8")
+
+    def chunk_info(self, row: int) -> dict:
+        _, meta, _ = self._open()
+        record = meta[row]
+        doc = self.manifest["documents"].get(str(int(record["doc_id"])), {})
+        return {
+            "doc_id": int(record["doc_id"]),
+            "document": doc.get("name"),
+            "page": int(record["page"]),
+            "span": (int(record["start"]), int(record["end"])),
+        }
@@ -1,19 +1,19 @@
 import fitz  # PyMuPDF
-import pytesseract
-from pdf2image import convert_from_path
 from docx import Document
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+import openpyxl
 import pandas as pd
 import warnings
 warnings.filterwarnings('ignore')
 
-from config import POPPLER_PATH, TESSERACT_PATH
-
-# Set OCR paths
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+from config import TEXT_PAGE_LINES, DOCX_BLOCK_CHARS, EXCEL_ROWS_PER_GROUP
+from src.ocr_engine import PageOCREngine
 
 class DocumentLoader:
     def __init__(self):
         self.supported_formats = ['.pdf', '.txt', '.docx', '.doc', '.xlsx', '.xls']
+        self.ocr_engine = PageOCREngine()
     
     def load_document(self, file_path: str) -> tuple[str, dict]:
         """Load any document type with metadata"""
@@ -30,54 +30,65 @@ class DocumentLoader:
         else:
             raise ValueError(f"Unsupported file format: {file_ext}")
     
+    def iter_pages(self, file_path: str, metadata: dict = None):
+        """Yield (page_number, text) pairs without holding the whole document.
+
+        ``metadata`` is filled in place while the pages are consumed.
+        """
+        if metadata is None:
+            metadata = {}
+        file_ext = file_path.lower().split('.')[-1]
+
+        if file_ext == 'pdf':
+            yield from self._iter_pdf_pages(file_path, metadata)
+        elif file_ext in ['txt', 'md']:
+            yield from self._iter_text_pages(file_path, metadata)
+        elif file_ext in ['docx', 'doc']:
+            yield from self._iter_docx_pages(file_path, metadata)
+        elif file_ext == 'xlsx':
+            yield from self._iter_excel_pages(file_path, metadata)
+        elif file_ext == 'xls':
+            text, loaded_metadata = self.load_document(file_path)
+            metadata.update(loaded_metadata)
+            yield 1, text
+        else:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+
     def _load_pdf(self, pdf_path: str) -> tuple[str, dict]:
-        """Load PDF with OCR fallback"""
-        text = self._extract_text_from_pdf(pdf_path)
-        metadata = {
-            'type': 'pdf',
-            'pages': self._count_pdf_pages(pdf_path),
-            'has_text': len(text.strip()) > 100
-        }
-        
-        # OCR fallback for scanned PDFs
-        if len(text.strip()) < 100:
-            print("⚠️ Low text detected, switching to OCR...")
-            text = self._ocr_pdf(pdf_path)
-            metadata['ocr_used'] = True
-        
+        """Load PDF, OCRing it page by page when it has no text layer"""
+        metadata = {}
+        text = "".join(page_text for _, page_text in self._iter_pdf_pages(pdf_path, metadata))
         return text, metadata
     
-    def _extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from PDF using PyMuPDF"""
-        doc = fitz.open(pdf_path)
-        text = ""
-        
-        for page in doc:
-            text += page.get_text()
-        
-        doc.close()
-        return text
-    
-    def _count_pdf_pages(self, pdf_path: str) -> int:
-        """Count pages in PDF"""
-        doc = fitz.open(pdf_path)
-        pages = len(doc)
-        doc.close()
-        return pages
-    
-    def _ocr_pdf(self, pdf_path: str) -> str:
-        """OCR for scanned PDFs"""
-        images = convert_from_path(
-            pdf_path,
-            dpi=300,
-            poppler_path=POPPLER_PATH
-        )
-        
-        text = ""
-        for img in images:
-            text += pytesseract.image_to_string(img) + "\n"
-        
-        return text
+    def _iter_pdf_pages(self, pdf_path: str, metadata: dict):
+        """Yield PDF pages one at a time, OCRing scanned pages in parallel"""
+        metadata.update({'type': 'pdf', 'pages': 0})
+        text_chars = 0
+
+        def text_layers():
+            nonlocal text_chars
+            doc = fitz.open(pdf_path)
+            try:
+                for page_number, page in enumerate(doc, start=1):
+                    text = page.get_text()
+                    text_chars += len(text.strip())
+                    metadata['pages'] = page_number
+                    yield page_number, text
+            finally:
+                doc.close()
+
+        yield from self.ocr_engine.iter_pages(pdf_path, text_layers())
+
+        timings = self.ocr_engine.page_timings
+        ocr_pages = sum(1 for t in timings if t['ocr'])
+        metadata['has_text'] = text_chars > 100
+        metadata['ocr_used'] = ocr_pages > 0
+        metadata['ocr_pages'] = ocr_pages
+        metadata['ocr_seconds'] = round(sum(t['seconds'] for t in timings), 3)
+        metadata['ocr_failed_pages'] = sum(1 for t in timings if 'ocr_error' in t)
+        metadata['page_timings'] = timings
+        if ocr_pages:
+            print(f"⚠️ OCR used on {ocr_pages}/{metadata['pages']} pages of a PDF without a text layer")
     
     def _load_text(self, file_path: str) -> tuple[str, dict]:
         """Load plain text files"""
@@ -86,16 +97,118 @@ class DocumentLoader:
         
         return text, {'type': 'text', 'lines': len(text.split('\n'))}
     
+    def _iter_text_pages(self, file_path: str, metadata: dict):
+        """Yield plain text files in fixed blocks of lines"""
+        metadata.update({'type': 'text', 'lines': 0})
+        block = []
+        page_number = 0
+
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                block.append(line)
+                metadata['lines'] += 1
+                if len(block) >= TEXT_PAGE_LINES:
+                    page_number += 1
+                    yield page_number, "".join(block)
+                    block = []
+
+        if block:
+            yield page_number + 1, "".join(block)
+    
     def _load_docx(self, file_path: str) -> tuple[str, dict]:
         """Load Word documents"""
-        doc = Document(file_path)
-        text = "\n".join([para.text for para in doc.paragraphs])
+        metadata = {}
+        text = "\n".join(block for _, block in self._iter_docx_pages(file_path, metadata))
         
-        return text, {'type': 'docx', 'paragraphs': len(doc.paragraphs)}
+        return text, metadata
+    
+    def _iter_docx_pages(self, file_path: str, metadata: dict):
+        """Yield paragraphs and tables in document order, grouped into ~DOCX_BLOCK_CHARS blocks"""
+        doc = Document(file_path)
+        metadata.update({'type': 'docx', 'paragraphs': 0, 'tables': 0})
+        block = []
+        block_len = 0
+        page_number = 0
+
+        for element in doc.element.body.iterchildren():
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag == 'p':
+                metadata['paragraphs'] += 1
+                text = Paragraph(element, doc).text
+            elif tag == 'tbl':
+                metadata['tables'] += 1
+                text = "\n".join(
+                    " | ".join(cell.text.strip() for cell in row.cells)
+                    for row in Table(element, doc).rows
+                )
+            else:
+                continue
+
+            if not text.strip():
+                continue
+
+            block.append(text)
+            block_len += len(text)
+            if block_len >= DOCX_BLOCK_CHARS:
+                page_number += 1
+                yield page_number, "\n".join(block)
+                block = []
+                block_len = 0
+
+        if block:
+            yield page_number + 1, "\n".join(block)
     
     def _load_excel(self, file_path: str) -> tuple[str, dict]:
         """Load Excel files"""
-        df = pd.read_excel(file_path)
-        text = df.to_string(index=False)
+        if file_path.lower().endswith('.xls'):
+            # openpyxl cannot read legacy .xls workbooks
+            df = pd.read_excel(file_path)
+            text = df.to_string(index=False)
+            return text, {'type': 'excel', 'rows': len(df), 'columns': len(df.columns)}
+
+        metadata = {}
+        text = "\n".join(record for _, record in self._iter_excel_pages(file_path, metadata))
         
-        return text, {'type': 'excel', 'rows': len(df), 'columns': len(df.columns)}
\ No newline at end of file
+        return text, metadata
+    
+    def _iter_excel_pages(self, file_path: str, metadata: dict):
+        """Yield row groups from every sheet in read-only mode, each repeating its header"""
+        metadata.update({'type': 'excel', 'sheets': 0, 'rows': 0, 'columns': 0})
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        page_number = 0
+
+        try:
+            for sheet in workbook.worksheets:
+                metadata['sheets'] += 1
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    continue
+
+                header_line = self._format_row(header)
+                metadata['columns'] = max(metadata['columns'], len(header))
+                group = []
+
+                for row in rows:
+                    if all(value is None for value in row):
+                        continue
+                    group.append(self._format_row(row))
+                    metadata['rows'] += 1
+                    if len(group) >= EXCEL_ROWS_PER_GROUP:
+                        page_number += 1
+                        yield page_number, self._format_row_group(sheet.title, header_line, group)
+                        group = []
+
+                if group:
+                    page_number += 1
+                    yield page_number, self._format_row_group(sheet.title, header_line, group)
+        finally:
+            workbook.close()
+
+    def _format_row(self, row) -> str:
+        return " | ".join("" if value is None else str(value) for value in row)
+
+    def _format_row_group(self, sheet_title: str, header_line: str, rows) -> str:
+        # One row per line, terminated so the chunker sees each row as a sentence
+        body = "\n".join(f"{row}." for row in rows)
+        return f"Sheet {sheet_title}: {header_line}.\n{body}\n"
@@ -0,0 +1,114 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable
+
+import numpy as np
+
+from config import EMBEDDING_CACHE_DB, EMBEDDING_CACHE_MEMORY_ITEMS, EMBEDDING_CACHE_MAX_ROWS
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """Two-level embedding cache keyed by (model name, text hash).
+
+    Level 1 is a bounded in-process LRU, level 2 a local SQLite table of
+    float32 vectors shared by every pipeline on the machine. The table keeps
+    the ``max_rows`` most recently written vectors (rowids grow with every
+    write, so the oldest rows are deleted by rowid range).
+    """
+
+    def __init__(self, model_name: str, db_path=EMBEDDING_CACHE_DB,
+                 max_memory_items: int = EMBEDDING_CACHE_MEMORY_ITEMS,
+                 max_rows: int = EMBEDDING_CACHE_MAX_ROWS):
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, key))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Look keys up in memory, then on disk; missing keys are left out.
+
+        Stats count every input key, so a repeated key counts each time.
+        """
+        keys = list(keys)
+        found = {}
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            in_memory = set(found)
+            self.stats["memory_hits"] += sum(1 for k in keys if k in in_memory)
+
+            missing = [k for k in dict.fromkeys(keys) if k not in found]
+            for i in range(0, len(missing), _SQL_BATCH):
+                batch = missing[i:i + _SQL_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? "
+                    f"AND key IN ({','.join('?' * len(batch))})",
+                    [self.model_name, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+
+            self.stats["disk_hits"] += sum(1 for k in keys if k in found and k not in in_memory)
+            self.stats["misses"] += sum(1 for k in keys if k not in found)
+
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray], persist: bool = True):
+        """Remember vectors; with ``persist`` also write them to disk in one transaction"""
+        with self._lock:
+            rows = []
+            for key, vector in items.items():
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((self.model_name, key, vector.tobytes()))
+
+            if not persist or not rows:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, key, vector) VALUES (?, ?, ?)", rows
+                )
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid <= (SELECT MAX(rowid) FROM embeddings) - ?",
+                    (self.max_rows,),
+                )
+
+    def summary(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 3) if lookups else 0.0
+        stats["memory_items"] = len(self._memory)
+        return stats
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
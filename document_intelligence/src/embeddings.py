@@ -1,19 +1,110 @@
 from sentence_transformers import SentenceTransformer
+import numpy as np
+import torch
 import os
 
+from config import (
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_DEVICE,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BACKEND,
+)
+from src.embedding_cache import EmbeddingCache
+from src.model_registry import ModelRegistry
+
 class EmbeddingModel:
-    def __init__(self, model_name="all-MiniLM-L6-v2"):
-        print(f"🔹 Loading embedding model (FAST MODE): {model_name}")
+    def __init__(self, model_name="all-MiniLM-L6-v2", use_cache: bool = EMBEDDING_CACHE_ENABLED,
+                 device: str = EMBEDDING_DEVICE, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 backend: str = EMBEDDING_BACKEND, registry: ModelRegistry = None):
         os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
         os.environ["TRANSFORMERS_NO_ADVISORY_WARNINGS"] = "1"
+        self.model_name = model_name
+        self.device = self._resolve_device(device)
+        self.batch_size = batch_size
+        self.backend = backend
 
-        self.model = SentenceTransformer(
-            model_name,
-            device="cuda"  # use GPU
-        )
+        if backend == "int8" and self.device != "cpu":
+            print(f"⚠️ int8 embedding backend is CPU-only, using float model on {self.device}")
+            self.backend = "torch"
+
+        if self.backend not in ("torch", "int8"):
+            raise ValueError(f"Unsupported embedding backend: {backend}")
+
+        # Quantised vectors differ slightly, so they get their own cache namespace
+        self.model_id = model_name if self.backend == "torch" else f"{model_name}@{self.backend}"
+        self.cache = EmbeddingCache(self.model_id) if use_cache else None
+
+        # The model itself is loaded on first encode: cache hits never need it
+        self.registry = registry or ModelRegistry()
+        self.registry.register("embedding", self._load_model)
+
+    @property
+    def model(self):
+        return self.registry.get("embedding")
+
+    def _load_model(self):
+        print(f"🔹 Loading embedding model (FAST MODE): {self.model_name} [{self.device}, {self.backend}]")
+        model = SentenceTransformer(self.model_name, device=self.device)
+
+        if self.backend == "int8":
+            # Dynamic quantisation: int8 Linear weights, activations quantised on the fly
+            model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        return model
+
+    @staticmethod
+    def _resolve_device(device: str) -> str:
+        if device != "auto":
+            return device
+        if torch.cuda.is_available():
+            return "cuda"
+        if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+            return "mps"
+        return "cpu"
 
-    def embed(self, texts):
-        return self.model.encode(texts, convert_to_numpy=True)
+    def embed(self, texts, persist: bool = False):
+        """Embed texts through the cache; only ``persist`` writes misses to the on-disk store.
+
+        One-off texts such as queries stay in the in-memory LRU, so they
+        neither cost a disk write nor crowd out chunk vectors.
+        """
+        if isinstance(texts, str):
+            return self.embed([texts], persist)[0]
+
+        if self.cache is None or not texts:
+            return self._encode(texts)
+
+        keys = [self.cache.text_key(t) for t in texts]
+        found = self.cache.get_many(keys)
+
+        # Only cache misses are encoded, in one batch, each distinct text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = self._encode(list(missing.values()))
+            encoded = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(encoded, persist=persist)
+            found.update(encoded)
+
+        return np.stack([found[key] for key in keys]).astype(np.float32, copy=False)
 
     def embed_chunks(self, texts):
-        return self.embed(texts)
+        return self.embed(texts, persist=True)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the embedding cache"""
+        return self.cache.summary() if self.cache is not None else {}
+
+    def _encode(self, texts):
+        # encode() sorts its input by length before batching, so each batch
+        # holds texts of similar length and padding stays small
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
@@ -0,0 +1,230 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import ENTITY_MAX_ANSWERS
+
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+
+PATTERNS = {
+    "email": re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
+    # Candidates only: see is_phone for the structure a phone number must have
+    "phone": re.compile(r"(?<![\w/.-])\+?\(?\d[\d \-().]{6,}\d(?![\w/-])"),
+    "date": re.compile(
+        rf"\b\d{{4}}-\d{{1,2}}-\d{{1,2}}\b"
+        rf"|\b\d{{1,2}}[/.-]\d{{1,2}}[/.-]\d{{2,4}}\b"
+        rf"|\b\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH},?\s+\d{{4}}\b"
+        rf"|\b{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}\b",
+        re.IGNORECASE,
+    ),
+    # Labelled names only ("Name: Jane Doe", "Author - J. R. Smith")
+    "name": re.compile(
+        r"\b(?:[Nn]ame|[Aa]uthor|[Ww]ritten by|[Pp]repared by|[Ss]ubmitted by)\s*[:\-]?\s*"
+        r"([A-Z](?:[a-zA-Z'-]+|\.)(?:[ \t]+[A-Z](?:[a-zA-Z'-]+|\.)){1,3})"
+    ),
+}
+
+# Digit groupings accepted without a "+" prefix or a phone label
+_PHONE_SHAPE = re.compile(
+    r"\(?\d{3}\)?[ .-]?\d{3}[ .-]\d{4}"             # 555-123-4567, (555) 123 4567
+    r"|\d{5}[ -]\d{5}"                               # 98765 43210
+    r"|0\d{2,4}[ -]\d{3,4}[ -]?\d{3,4}"                # 020 7946 0958
+)
+_THOUSANDS = re.compile(r"\d{1,3}(?:[ ,.]\d{3})+")
+_PHONE_LABEL = re.compile(r"\b(?:tel|phone|mobile|mob|cell|ph|contact|call)\b\W{0,5}(?:no\.?|number)?\W{0,5}$",
+                          re.IGNORECASE)
+
+
+def is_phone(text: str, match) -> bool:
+    """A phone candidate needs 8-15 digits, is not grouped thousands, and has a
+    leading "+", a phone-like digit grouping, or a phone label just before it"""
+    value = match.group().strip()
+    digits = sum(c.isdigit() for c in value)
+    if not 8 <= digits <= 15 or _THOUSANDS.fullmatch(value):
+        return False
+    if value.startswith("+") or _PHONE_SHAPE.fullmatch(value):
+        return True
+    return _PHONE_LABEL.search(text[max(0, match.start() - 25):match.start()]) is not None
+
+
+def find_entities(kind: str, text: str) -> List[str]:
+    """Values of one entity kind in ``text``, in order"""
+    return [value for k, value, _, _ in EntityIndex._extract(text) if k == kind]
+
+
+# Words that do not narrow an entity question ("What is the email?" vs "date of the meeting")
+_QUESTION_FILLER = {
+    "what", "whats", "is", "are", "the", "a", "an", "of", "this", "that", "document", "doc", "file",
+    "his", "her", "their", "your", "my", "its", "s", "give", "me", "tell", "show", "find", "list",
+    "all", "which", "please", "provide", "details", "detail", "info", "information", "address",
+    "no", "number", "numbers", "id", "e", "mail", "email", "emails", "phone", "phones", "mobile",
+    "telephone", "cell", "contact", "contacts", "date", "dates", "name", "names", "author",
+}
+
+# Question → entity kinds; the first matching rule wins
+QUESTION_KINDS = [
+    (re.compile(r"\be-?mails?\b"), ["email"]),
+    (re.compile(r"\b(?:phone|mobile|telephone|cell|contact number)s?\b"), ["phone"]),
+    (re.compile(r"\bcontacts?\b"), ["email", "phone"]),
+    (re.compile(r"\bdates?\b"), ["date"]),
+    (re.compile(r"\bnames?\b|\bauthor\b"), ["name"]),
+]
+
+# Characters of already-scanned text kept so entities crossing a chunk boundary are found
+_LOOKBACK = 256
+# Matches ending this close to the end of the text seen so far wait for more text
+_HOLD_BACK = 64
+
+
+class Entity(NamedTuple):
+    kind: str
+    value: str
+    chunk: int  # index into the pipeline's chunks
+    page: Optional[int]
+
+
+class EntityIndex:
+    """Emails, phone numbers, dates and labelled names extracted at ingestion.
+
+    The document text is rebuilt from the chunks and their offsets in it
+    (overlaps are added once) and scanned once with precompiled patterns, so
+    entities that cross a chunk boundary are found too. Each distinct value
+    keeps the chunk (and page) it was first seen in. Factual questions about
+    these kinds are answered by ``lookup`` without retrieval or models.
+    """
+
+    def __init__(self, max_answers: int = ENTITY_MAX_ANSWERS):
+        self.max_answers = max_answers
+        self.reset()
+
+    def reset(self):
+        self.entities: Dict[str, List[Entity]] = {kind: [] for kind in PATTERNS}
+        self._seen = {kind: set() for kind in PATTERNS}
+        self.num_chunks = 0
+        self._text = ""    # unscanned tail of the document text, plus _LOOKBACK characters
+        self._base = 0     # offset of _text in the document text
+        self._scanned = 0  # entities ending before this offset are indexed
+        self._spans = []   # (start, end, chunk row, page) of the chunks still in _text
+
+    def build(self, chunks: List[str], chunk_pages: List[int] = None, chunk_starts: List[int] = None):
+        self.reset()
+        self.add(chunks, chunk_pages, chunk_starts)
+        self.finish()
+
+    def add(self, chunks: List[str], chunk_pages: List[int] = None, chunk_starts: List[int] = None):
+        """Index chunks appended after the ones already indexed.
+
+        ``chunk_starts`` are the chunks' offsets in the (cleaned) document
+        text; without them the chunks are taken as consecutive pieces of it
+        joined by spaces. Entities near the end wait for the next chunks or
+        ``finish``.
+        """
+        for offset, chunk in enumerate(chunks):
+            end_of_text = self._base + len(self._text)
+            if chunk_starts:
+                start = chunk_starts[offset]
+            else:
+                start = end_of_text + 1 if end_of_text else 0
+            page = chunk_pages[offset] if chunk_pages else None
+            self._spans.append((start, start + len(chunk), self.num_chunks + offset, page))
+
+            # Overlapping chunks only add the text past what is already there
+            if start + len(chunk) > end_of_text:
+                gap = start - end_of_text
+                self._text += " " * gap + chunk if gap >= 0 else chunk[-gap:]
+        self.num_chunks += len(chunks)
+        self._scan(final=False)
+
+    def finish(self):
+        """Index the entities held back at the end of the text"""
+        self._scan(final=True)
+
+    def _scan(self, final: bool):
+        end_of_text = self._base + len(self._text)
+        limit = end_of_text if final else end_of_text - _HOLD_BACK
+        for kind, value, start, end in self._extract(self._text):
+            end += self._base
+            if self._scanned < end <= limit:
+                self._index(kind, value, self._base + start, end)
+        self._scanned = max(self._scanned, limit)
+
+        keep = max(self._base, self._scanned - _LOOKBACK)
+        self._text = self._text[keep - self._base:]
+        self._base = keep
+        self._spans = [span for span in self._spans if span[1] > keep]
+
+    def _index(self, kind: str, value: str, start: int, end: int):
+        key = self._normalize(kind, value)
+        if key in self._seen[kind]:
+            return
+        self._seen[kind].add(key)
+
+        # The first chunk holding the whole value, else the one it starts in
+        spans = [span for span in self._spans if span[0] <= start < span[1]] or self._spans[-1:]
+        _, _, row, page = next((span for span in spans if end <= span[1]), spans[0])
+        self.entities[kind].append(Entity(kind, value, row, page))
+
+    @staticmethod
+    def _extract(text: str):
+        """(kind, value, start, end) for every entity in ``text``"""
+        dates = list(PATTERNS["date"].finditer(text))
+        for match in dates:
+            yield "date", match.group(), match.start(), match.end()
+
+        for match in PATTERNS["email"].finditer(text):
+            yield "email", match.group(), match.start(), match.end()
+
+        for match in PATTERNS["phone"].finditer(text):
+            overlaps_date = any(d.start() < match.end() and match.start() < d.end() for d in dates)
+            if not overlaps_date and is_phone(text, match):
+                yield "phone", match.group().strip(), match.start(), match.end()
+
+        for match in PATTERNS["name"].finditer(text):
+            yield "name", match.group(1), match.start(1), match.end(1)
+
+    @staticmethod
+    def _normalize(kind: str, value: str) -> str:
+        if kind == "phone":
+            # Trunk zeros and the country code aside, the last 10 digits name the line:
+            # "+91 98765 43210" == "98765 43210", "+44 20 7946 0958" == "020 7946 0958"
+            return "".join(c for c in value if c.isdigit()).lstrip("0")[-10:]
+        return " ".join(value.lower().split())
+
+    @staticmethod
+    def question_kinds(question: str) -> List[str]:
+        q = question.lower()
+        for pattern, kinds in QUESTION_KINDS:
+            if pattern.search(q):
+                return kinds
+        return []
+
+    @staticmethod
+    def qualifiers(question: str) -> set:
+        """Words that narrow the entity ("meeting" in "date of the meeting")"""
+        return {word for word in re.findall(r"[a-z]+", question.lower()) if word not in _QUESTION_FILLER}
+
+    def lookup(self, question: str, chunks: List[str] = None) -> Optional[Tuple[str, List[Entity], str]]:
+        """(answer, entities, fast path) for a question the index can answer, else None.
+
+        A plain question ("What is the email?") is answered with up to
+        ``max_answers`` values. A qualified one ("date of the meeting") is
+        answered only when exactly one value comes from a chunk (of
+        ``chunks``) containing every qualifier word. Everything else is left
+        to the retrieval routes.
+        """
+        kinds = self.question_kinds(question)
+        found = [entity for kind in kinds for entity in self.entities[kind]]
+        qualifiers = self.qualifiers(question)
+        if qualifiers:
+            if chunks is None:
+                return None
+            found = [entity for entity in found
+                     if qualifiers <= set(re.findall(r"[a-z]+", chunks[entity.chunk].lower()))]
+        limit = 1 if qualifiers else self.max_answers
+        if not found or len(found) > limit:
+            return None
+
+        answer = ", ".join(entity.value for entity in found)
+        return answer, found, "+".join(kinds)
+
+    def summary(self) -> dict:
+        return {kind: len(entities) for kind, entities in self.entities.items()}
@@ -0,0 +1,118 @@
+import re
+from collections import defaultdict
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+from config import GENERATION_POLICY, GENERATION_STOP_STRINGS
+
+# A complete sentence followed by a line break: the answer is finished
+SENTENCE_END = re.compile(r'([.!?]["\')\]]*)[ \t]*\n')
+
+
+class AnswerStoppingCriteria(StoppingCriteria):
+    """Stops each sequence once its answer hits a stop string or, with
+    ``stop_on_newline``, a newline after a complete sentence.
+
+    Only the last ``window`` generated tokens are decoded per step.
+    """
+
+    def __init__(self, tokenizer, prompt_length: int, stop_strings, stop_on_newline: bool,
+                 window: int = 12):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.stop_strings = list(stop_strings)
+        self.stop_on_newline = stop_on_newline
+        self.window = window
+
+    def _finished(self, tail: str) -> bool:
+        if any(s in tail for s in self.stop_strings):
+            return True
+        return self.stop_on_newline and SENTENCE_END.search(tail) is not None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        generated = input_ids[:, self.prompt_length:]
+        if generated.shape[1] == 0:
+            return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+        tails = self.tokenizer.batch_decode(generated[:, -self.window:], skip_special_tokens=True)
+        done = [self._finished(tail) for tail in tails]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
+class GenerationPolicy:
+    """Decoding settings per query complexity plus per-class generation stats.
+
+    Classes come from ``AdaptiveChunker.analyze_query_complexity``; unknown
+    classes use the "medium" settings.
+    """
+
+    def __init__(self, policies: dict = None, stop_strings=None):
+        self.policies = policies or GENERATION_POLICY
+        self.stop_strings = list(GENERATION_STOP_STRINGS if stop_strings is None else stop_strings)
+        self.stats = defaultdict(lambda: {"answers": 0, "generated_tokens": 0, "seconds": 0.0})
+
+    def settings(self, complexity: str) -> dict:
+        return self.policies.get(complexity, self.policies["medium"])
+
+    def generation_kwargs(self, tokenizer, prompt_length: int, complexity: str) -> dict:
+        settings = self.settings(complexity)
+        kwargs = {"max_new_tokens": settings["max_new_tokens"], "do_sample": settings["do_sample"]}
+        if settings["do_sample"]:
+            kwargs["temperature"] = settings["temperature"]
+
+        kwargs["stopping_criteria"] = StoppingCriteriaList([
+            AnswerStoppingCriteria(tokenizer, prompt_length, self.stop_strings,
+                                   settings.get("stop_on_newline", False))
+        ])
+        return kwargs
+
+    def trim(self, text: str, complexity: str) -> str:
+        """Cut ``text`` where the stopping criteria would have stopped"""
+        end = len(text)
+        for stop in self.stop_strings:
+            index = text.find(stop)
+            if index != -1:
+                end = min(end, index)
+
+        if self.settings(complexity).get("stop_on_newline"):
+            match = SENTENCE_END.search(text, 0, end)
+            if match:
+                end = match.end(1)
+        return text[:end]
+
+    def partial_stop(self, text: str) -> int:
+        """Length of a trailing prefix of a stop string (held back while streaming)"""
+        longest = 0
+        for stop in self.stop_strings:
+            for k in range(min(len(stop) - 1, len(text)), longest, -1):
+                if text.endswith(stop[:k]):
+                    longest = k
+                    break
+        return longest
+
+    def record(self, complexity: str, generated_tokens: int, seconds: float) -> dict:
+        stats = self.stats[complexity]
+        stats["answers"] += 1
+        stats["generated_tokens"] += int(generated_tokens)
+        stats["seconds"] += seconds
+
+        settings = self.settings(complexity)
+        return {
+            "query_complexity": complexity,
+            "max_new_tokens": settings["max_new_tokens"],
+            "greedy": not settings["do_sample"],
+            "generated_tokens": int(generated_tokens),
+            "generation_time": round(seconds, 3),
+        }
+
+    def summary(self) -> dict:
+        """Mean generated tokens and generation time per complexity class"""
+        return {
+            complexity: {
+                "answers": stats["answers"],
+                "mean_generated_tokens": round(stats["generated_tokens"] / stats["answers"], 1),
+                "mean_generation_time": round(stats["seconds"] / stats["answers"], 3),
+            }
+            for complexity, stats in self.stats.items() if stats["answers"]
+        }
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config import INGESTION_CACHE_DIR, INGESTION_CACHE_MAX_BYTES
+from src.ann_index import IVFIndex
+
+CACHE_VERSION = 2  # 2: embeddings are stored L2-normalised
+
+
+class IngestionCache:
+    """On-disk cache of ingested documents keyed by content hash and settings.
+
+    Each entry is a directory holding the extracted text, metadata, chunks and
+    an ``embeddings.npy`` matrix that is memory-mapped on load, plus the
+    trained IVF index (``ivf.npz``) when the retriever used one. Entries are
+    evicted least-recently-used first once the cache exceeds ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=INGESTION_CACHE_DIR, max_bytes: int = INGESTION_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+        """SHA-256 of the file contents, read in 1MB blocks"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(file_hash: str, settings: dict) -> str:
+        payload = json.dumps(
+            {"version": CACHE_VERSION, "file": file_hash, "settings": settings},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached entry for ``key`` or None"""
+        entry_dir = self.cache_dir / key
+        manifest_path = entry_dir / "manifest.json"
+        if not manifest_path.exists():
+            return None
+
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            with open(entry_dir / "chunks.json", "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+            with open(entry_dir / "text.txt", "r", encoding="utf-8") as f:
+                text = f.read()
+            embeddings = np.load(entry_dir / "embeddings.npy", mmap_mode="r")
+            ivf_path = entry_dir / "ivf.npz"
+            ann = IVFIndex.load(ivf_path) if ivf_path.exists() else None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Dropping unreadable cache entry {key[:12]}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        # Touch the manifest so eviction sees this entry as recently used
+        os.utime(manifest_path, None)
+
+        return {
+            "text": text,
+            "metadata": manifest["metadata"],
+            "chunk_size": manifest["chunk_size"],
+            "chunks": chunks["chunks"],
+            "chunk_pages": chunks["chunk_pages"],
+            # Older entries have no offsets; the entity index then treats chunks as consecutive
+            "chunk_starts": chunks.get("chunk_starts"),
+            "embeddings": embeddings,
+            "ann": ann,
+        }
+
+    def put(self, key: str, text: str, metadata: dict, chunks, chunk_pages, chunk_size, embeddings,
+            ann=None, chunk_starts=None):
+        """Store an entry atomically, then evict old entries if over budget.
+
+        ``ann`` is the retriever's ANN index; a trained IVF index is saved so
+        restoring the entry skips k-means.
+        """
+        entry_dir = self.cache_dir / key
+        tmp_dir = self.cache_dir / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        try:
+            with open(tmp_dir / "text.txt", "w", encoding="utf-8") as f:
+                f.write(text)
+            with open(tmp_dir / "chunks.json", "w", encoding="utf-8") as f:
+                json.dump({"chunks": list(chunks), "chunk_pages": list(chunk_pages),
+                           "chunk_starts": list(chunk_starts) if chunk_starts else None}, f)
+            np.save(tmp_dir / "embeddings.npy", np.asarray(embeddings))
+            if isinstance(ann, IVFIndex) and ann.trained:
+                ann.save(tmp_dir / "ivf.npz")
+            # The manifest is written last: its presence marks a complete entry
+            with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as f:
+                json.dump({
+                    "created": time.time(),
+                    "metadata": metadata,
+                    "chunk_size": chunk_size,
+                }, f, default=str)
+
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except OSError as e:
+            print(f"⚠️ Could not write ingestion cache entry: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry_dir in self.cache_dir.iterdir():
+            manifest_path = entry_dir / "manifest.json"
+            if not manifest_path.exists():
+                continue
+            size = sum(p.stat().st_size for p in entry_dir.iterdir() if p.is_file())
+            entries.append((manifest_path.stat().st_mtime, size, entry_dir))
+            total += size
+
+        for _, size, entry_dir in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            print(f"🧹 Evicted ingestion cache entry {entry_dir.name[:12]}")
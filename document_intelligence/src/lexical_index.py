@@ -0,0 +1,148 @@
+import re
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+
+from config import BM25_K1, BM25_B
+
+# Words, plus compound tokens such as IDs, emails and dotted numbers ("INV-2023-001")
+_TOKEN_RE = re.compile(r"\w+(?:[-./@]\w+)*")
+_PART_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased tokens; compound tokens are also split into their word parts"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(_PART_RE.findall(token))
+    return tokens
+
+
+class BM25Index:
+    """Inverted index over chunk texts scored with Okapi BM25.
+
+    Chunks are tokenised once when added. Postings are kept in CSR layout
+    (per-term slices of chunk ids and precomputed BM25 weights), so a query
+    only tokenises itself and sums the weights of its terms' postings.
+    Weights depend on corpus statistics and are recomputed lazily after adds.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.reset()
+
+    def reset(self):
+        self.vocab = {}
+        self.doc_lengths = np.empty(0, dtype=np.float32)
+        self._pending = []  # (term ids, chunk ids, term frequencies) per added batch
+        self._terms = np.empty(0, dtype=np.int64)
+        self._docs = np.empty(0, dtype=np.int64)
+        self._tfs = np.empty(0, dtype=np.float32)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._weights = np.empty(0, dtype=np.float32)
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, texts: List[str]):
+        """Tokenise and append chunks (in Retriever order)"""
+        offset = len(self.doc_lengths)
+        terms, docs, tfs, lengths = [], [], [], []
+
+        for i, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                terms.append(self.vocab.setdefault(token, len(self.vocab)))
+                docs.append(offset + i)
+                tfs.append(tf)
+
+        self.doc_lengths = np.concatenate([self.doc_lengths, np.array(lengths, dtype=np.float32)])
+        self._pending.append((
+            np.array(terms, dtype=np.int64),
+            np.array(docs, dtype=np.int64),
+            np.array(tfs, dtype=np.float32),
+        ))
+        self._dirty = True
+
+    def _finalize(self):
+        """Merge pending postings and recompute BM25 weights for the current corpus"""
+        if self._pending:
+            self._terms = np.concatenate([self._terms] + [p[0] for p in self._pending])
+            self._docs = np.concatenate([self._docs] + [p[1] for p in self._pending])
+            self._tfs = np.concatenate([self._tfs] + [p[2] for p in self._pending])
+            self._pending = []
+
+            order = np.argsort(self._terms, kind="stable")
+            self._terms, self._docs, self._tfs = self._terms[order], self._docs[order], self._tfs[order]
+            counts = np.bincount(self._terms, minlength=len(self.vocab))
+            self._indptr = np.concatenate(([0], np.cumsum(counts)))
+
+        n = len(self.doc_lengths)
+        df = np.diff(self._indptr).astype(np.float32)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+
+        avg_length = self.doc_lengths.mean() if n else 1.0
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[self._docs] / max(avg_length, 1e-10))
+        self._weights = (idf[self._terms] * self._tfs * (self.k1 + 1) / (self._tfs + norm)).astype(np.float32)
+        self._dirty = False
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for ``query``"""
+        if self._dirty:
+            self._finalize()
+
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids:
+            return np.zeros(len(self.doc_lengths), dtype=np.float32)
+
+        slices = [slice(self._indptr[t], self._indptr[t + 1]) for t in term_ids]
+        docs = np.concatenate([self._docs[s] for s in slices])
+        weights = np.concatenate([self._weights[s] for s in slices])
+        return np.bincount(docs, weights=weights, minlength=len(self.doc_lengths)).astype(np.float32)
+
+    def search(self, query: str, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (chunk ids, scores) among chunks sharing at least one query term"""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores)
+        k = min(top_k, len(matched))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        best = matched[np.argpartition(-scores[matched], k - 1)[:k]] if k < len(matched) else matched
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best, scores[best]
+
+    # ================= PERSISTENCE ================= #
+    def save(self, path):
+        """Write vocabulary, postings and chunk lengths; weights are recomputed on load"""
+        if self._dirty:
+            self._finalize()
+        np.savez(
+            path,
+            vocab=np.array(list(self.vocab), dtype=str),
+            doc_lengths=self.doc_lengths,
+            docs=self._docs,
+            tfs=self._tfs,
+            indptr=self._indptr,
+            params=np.array([self.k1, self.b]),
+        )
+
+    @classmethod
+    def load(cls, path) -> "BM25Index":
+        data = np.load(path)
+        k1, b = (float(v) for v in data["params"])
+        index = cls(k1=k1, b=b)
+        index.vocab = {token: i for i, token in enumerate(data["vocab"].tolist())}
+        index.doc_lengths = data["doc_lengths"]
+        index._docs = data["docs"]
+        index._tfs = data["tfs"]
+        index._indptr = data["indptr"]
+        index._terms = np.repeat(np.arange(len(index.vocab), dtype=np.int64), np.diff(index._indptr))
+        index._dirty = True
+        return index
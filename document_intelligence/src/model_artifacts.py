@@ -0,0 +1,209 @@
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+
+from config import ARTIFACT_SHARD_SIZE
+
+MANIFEST_NAME = "manifest.json"
+
+# Variants written to disk; "int8" reuses the float32 shards and is quantised at load time
+# (dynamically quantised Linear layers cannot be stored as plain safetensors)
+STORED_DTYPES = {"fp32": torch.float32, "bf16": torch.bfloat16}
+VARIANTS = ["fp32", "bf16", "int8"]
+
+
+def read_manifest(artifact_dir):
+    path = Path(artifact_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(artifact_dir, manifest):
+    path = Path(artifact_dir) / MANIFEST_NAME
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+
+
+# ================= PREPARATION ================= #
+def _load_source(model_name, dtype, trust_remote_code):
+    try:
+        # Eager attention avoids requiring flash-attention just to export weights
+        return AutoModelForCausalLM.from_pretrained(
+            model_name,
+            trust_remote_code=trust_remote_code,
+            attn_implementation="eager",
+            torch_dtype=dtype,
+            low_cpu_mem_usage=True,
+        )
+    except (TypeError, ValueError) as e:
+        print(f"   ⚠️ Eager attention load failed ({e}), using default settings")
+        return AutoModelForCausalLM.from_pretrained(
+            model_name,
+            trust_remote_code=trust_remote_code,
+            torch_dtype=dtype,
+            low_cpu_mem_usage=True,
+        )
+
+
+def prepare_artifacts(model_name, artifact_dir, variants=("fp32", "bf16", "int8"),
+                      shard_size: str = ARTIFACT_SHARD_SIZE, trust_remote_code: bool = True):
+    """Write safetensors shards per variant plus a manifest describing them.
+
+    Layout: tokenizer files and ``manifest.json`` at the top level, one
+    sub-directory of ``shard_size`` safetensors shards per stored dtype.
+    Safetensors shards are memory-mapped on load instead of unpickled.
+    """
+    artifact_dir = Path(artifact_dir)
+    artifact_dir.mkdir(parents=True, exist_ok=True)
+    unknown = set(variants) - set(VARIANTS)
+    if unknown:
+        raise ValueError(f"Unknown model variants: {sorted(unknown)}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=trust_remote_code)
+    tokenizer.save_pretrained(artifact_dir)
+
+    stored = {"fp32"} if "int8" in variants else set()
+    stored |= {v for v in variants if v in STORED_DTYPES}
+
+    manifest = {"model": str(model_name), "created": time.time(), "variants": {}, "measurements": {}}
+    for variant in sorted(stored):
+        print(f"💾 Writing {variant} safetensors shards...")
+        model = _load_source(model_name, STORED_DTYPES[variant], trust_remote_code)
+        model.save_pretrained(artifact_dir / variant, safe_serialization=True, max_shard_size=shard_size)
+        del model
+
+        manifest["variants"][variant] = {
+            "path": variant,
+            "dtype": variant,
+            "bytes": _dir_bytes(artifact_dir / variant),
+        }
+
+    if "int8" in variants:
+        manifest["variants"]["int8"] = {"path": "fp32", "dtype": "fp32", "quantize": "dynamic_int8",
+                                        "bytes": manifest["variants"]["fp32"]["bytes"]}
+
+    _write_manifest(artifact_dir, manifest)
+    print(f"✅ Model artifacts ready: {', '.join(manifest['variants'])}")
+    return manifest
+
+
+# ================= LOADING ================= #
+def bf16_supported() -> bool:
+    checker = getattr(torch.cpu, "_is_avx512_bf16_supported", None)
+    return bool(checker and checker())
+
+
+def choose_variant(manifest: dict, device: str, preferred: str = "auto") -> str:
+    """Variant to serve on ``device``: ``preferred`` if available, otherwise the fastest for the host.
+
+    On CPU the stored variant with the lowest measured load time (then peak
+    RSS) wins when ``measure_artifacts`` has run. int8 is never picked
+    automatically: it loads the fp32 shards and quantises them at load time,
+    so it is opt-in through ``preferred``.
+    """
+    available = list(manifest["variants"])
+    if preferred != "auto":
+        if preferred not in manifest["variants"]:
+            raise ValueError(f"Model variant {preferred} not prepared; available: {available}")
+        return preferred
+
+    candidates = [v for v in available if v != "int8"]
+    measured = {v: m for v, m in manifest.get("measurements", {}).items()
+                if v in candidates and m.get("load_seconds") is not None}
+    if device != "cuda" and measured:
+        return min(measured, key=lambda v: (measured[v]["load_seconds"],
+                                            measured[v].get("peak_rss_mb") or float("inf")))
+
+    # Half-precision weights on GPU and on CPUs with native bf16; fp32 otherwise
+    order = ["bf16", "fp32"] if device == "cuda" or bf16_supported() else ["fp32", "bf16"]
+    for variant in order:
+        if variant in candidates:
+            return variant
+    raise ValueError("Model manifest lists no automatically usable variants; set GENERATOR_VARIANT")
+
+
+def load_variant(artifact_dir, variant: str, device: str, trust_remote_code: bool = True):
+    manifest = read_manifest(artifact_dir)
+    info = manifest["variants"][variant]
+    dtype = STORED_DTYPES[info["dtype"]]
+    if device == "cuda" and dtype == torch.float32:
+        dtype = torch.float16
+
+    model = AutoModelForCausalLM.from_pretrained(
+        Path(artifact_dir) / info["path"],
+        trust_remote_code=trust_remote_code,
+        torch_dtype=dtype,
+        low_cpu_mem_usage=True,
+        device_map="auto" if device == "cuda" else None,
+    )
+
+    if info.get("quantize") == "dynamic_int8":
+        # Linear weights become int8; activations are quantised on the fly
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model.eval()
+
+
+# ================= MEASUREMENT ================= #
+def peak_rss_mb():
+    """Peak resident memory of this process, or None where it cannot be read"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / 1e6 if sys.platform == "darwin" else peak / 1e3, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / 1e6, 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def _measure_worker(artifact_dir, variant, queue):
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    load_variant(artifact_dir, variant, "cpu")
+    queue.put({
+        "load_seconds": round(time.perf_counter() - start, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline,
+    })
+
+
+def measure_artifacts(artifact_dir, variants=None) -> dict:
+    """CPU load time and peak RSS per variant, each loaded in a fresh process.
+
+    Results are stored in the manifest under ``measurements``.
+    """
+    manifest = read_manifest(artifact_dir)
+    variants = variants or list(manifest["variants"])
+
+    context = multiprocessing.get_context("spawn")
+    for variant in variants:
+        queue = context.Queue()
+        process = context.Process(target=_measure_worker, args=(str(artifact_dir), variant, queue))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"⚠️ Measuring {variant} failed (exit code {process.exitcode})")
+            continue
+        manifest["measurements"][variant] = queue.get(timeout=30)
+        print(f"⏱️ {variant}: {manifest['measurements'][variant]}")
+
+    _write_manifest(artifact_dir, manifest)
+    return manifest["measurements"]
@@ -0,0 +1,161 @@
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable
+
+from config import MODEL_IDLE_SECONDS
+
+try:
+    import psutil
+except ImportError:  # resident memory is reported only when psutil is installed
+    psutil = None
+
+
+def resident_memory_mb():
+    if psutil is None:
+        return None
+    return round(psutil.Process(os.getpid()).memory_info().rss / 1e6, 1)
+
+
+class ModelRegistry:
+    """Loads models on first use and unloads idle ones.
+
+    Each model is registered with a loader function and loaded the first
+    time ``get`` asks for it (or ahead of time by ``warm`` in a background
+    thread). Models registered with ``evict_when_idle`` are unloaded after
+    ``idle_seconds`` without use; a model held by ``in_use`` is never
+    unloaded. Load time and the process's resident memory before and after
+    each load are recorded per model.
+    """
+
+    def __init__(self, idle_seconds: float = MODEL_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._loaders: Dict[str, Callable] = {}
+        self._evictable = set()
+        self._on_unload: Dict[str, Callable] = {}
+        self._models = {}
+        self._last_used = {}
+        self._users: Dict[str, int] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        self.stats = {}
+
+    def register(self, name: str, loader: Callable, evict_when_idle: bool = False,
+                 on_unload: Callable = None):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks[name] = threading.Lock()
+            self._users.setdefault(name, 0)
+            if evict_when_idle:
+                self._evictable.add(name)
+            if on_unload is not None:
+                self._on_unload[name] = on_unload
+            self.stats.setdefault(name, {"loads": 0, "unloads": 0, "load_seconds": None,
+                                         "rss_before_mb": None, "rss_after_mb": None})
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str):
+        """Return the model, loading it first if needed"""
+        model = self._models.get(name)
+        if model is None:
+            # One loader per model at a time; a concurrent warm-up is waited for
+            with self._locks[name]:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._load(name)
+        self._last_used[name] = time.monotonic()
+        return model
+
+    @contextmanager
+    def in_use(self, name: str):
+        """Yield the model, keeping it loaded until the block exits"""
+        with self._lock:
+            self._users[name] += 1
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                self._users[name] -= 1
+                # The idle timer starts when the last user is done
+                if name in self._models:
+                    self._last_used[name] = time.monotonic()
+
+    def _load(self, name: str):
+        rss_before = resident_memory_mb()
+        start = time.perf_counter()
+        model = self._loaders[name]()
+        seconds = time.perf_counter() - start
+
+        self._models[name] = model
+        stats = self.stats[name]
+        stats["loads"] += 1
+        stats["load_seconds"] = round(seconds, 2)
+        stats["rss_before_mb"] = rss_before
+        stats["rss_after_mb"] = resident_memory_mb()
+        print(f"📦 Loaded {name} in {seconds:.1f}s")
+
+        if name in self._evictable and self.idle_seconds:
+            self._start_reaper()
+        return model
+
+    def warm(self, names: Iterable[str]) -> threading.Thread:
+        """Load ``names`` in a background thread; ``get`` waits for an in-progress load"""
+        names = list(names)
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"⚠️ Warm-up of {name} failed: {e}")
+
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self, name: str) -> bool:
+        """Unload ``name`` unless it is not loaded or held by ``in_use``"""
+        with self._locks[name]:
+            # Checked together with the pop, so a new user either keeps the model or reloads it
+            with self._lock:
+                if self._users[name] or self._models.pop(name, None) is None:
+                    return False
+                self._last_used.pop(name, None)
+            if name in self._on_unload:
+                self._on_unload[name]()
+            gc.collect()
+
+        self.stats[name]["unloads"] += 1
+        print(f"💤 Unloaded idle model {name}")
+        return True
+
+    def evict_idle(self):
+        now = time.monotonic()
+        for name in list(self._evictable):
+            last_used = self._last_used.get(name)
+            if last_used is not None and now - last_used >= self.idle_seconds:
+                self.unload(name)
+
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+
+            def reap():
+                while True:
+                    time.sleep(max(1.0, min(self.idle_seconds / 4, 60.0)))
+                    self.evict_idle()
+
+            self._reaper = threading.Thread(target=reap, name="model-reaper", daemon=True)
+            self._reaper.start()
+
+    def summary(self) -> dict:
+        return {
+            "models": {name: {**stats, "loaded": self.is_loaded(name)} for name, stats in self.stats.items()},
+            "rss_mb": resident_memory_mb(),
+        }
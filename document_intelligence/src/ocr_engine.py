@@ -0,0 +1,147 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, Tuple
+
+from config import (
+    POPPLER_PATH, TESSERACT_PATH, OCR_DPI, OCR_MIN_DOCUMENT_CHARS, OCR_PAGE_LEVEL,
+    OCR_MIN_PAGE_CHARS, OCR_MAX_WORKERS,
+)
+
+
+def ocr_page(pdf_path: str, page_number: int, dpi: int = OCR_DPI) -> str:
+    """Render a single PDF page and run Tesseract on it"""
+    # Imported here so the scheduler can run (and be tested) without OCR tools
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+
+    images = convert_from_path(
+        pdf_path,
+        dpi=dpi,
+        first_page=page_number,
+        last_page=page_number,
+        poppler_path=POPPLER_PATH
+    )
+    return "".join(pytesseract.image_to_string(img) + "\n" for img in images)
+
+
+def _timed_ocr(ocr_fn: Callable, pdf_path: str, page_number: int, dpi: int) -> Tuple[str, float]:
+    start = time.perf_counter()
+    text = ocr_fn(pdf_path, page_number, dpi)
+    return text, time.perf_counter() - start
+
+
+class PageOCREngine:
+    """OCR scanned PDFs page by page in a process pool.
+
+    By default a PDF is OCRed only when its whole text layer has fewer than
+    ``min_document_chars`` characters, so blank, cover and figure pages of a
+    digital PDF are left alone. With ``page_level`` every page below
+    ``min_page_chars`` is OCRed instead. A page whose OCR fails keeps its
+    text layer.
+
+    ``ocr_fn(pdf_path, page_number, dpi)`` renders and recognises one page; it
+    runs inside the worker, so page images never pile up in the parent. Pass a
+    stub (and e.g. ``ThreadPoolExecutor`` as ``executor_factory``) to exercise
+    the scheduler without Tesseract.
+    """
+
+    def __init__(self, ocr_fn: Callable = ocr_page, max_workers: int = OCR_MAX_WORKERS,
+                 dpi: int = OCR_DPI, min_page_chars: int = OCR_MIN_PAGE_CHARS,
+                 executor_factory: Callable = None, page_level: bool = OCR_PAGE_LEVEL,
+                 min_document_chars: int = OCR_MIN_DOCUMENT_CHARS):
+        self.ocr_fn = ocr_fn
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.dpi = dpi
+        self.min_page_chars = min_page_chars
+        self.page_level = page_level
+        self.min_document_chars = min_document_chars
+        self.executor_factory = executor_factory or ProcessPoolExecutor
+        self.page_timings = []
+
+    def needs_ocr(self, text: str) -> bool:
+        return len(text.strip()) < self.min_page_chars
+
+    def _plan(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str, bool]]:
+        """(page_number, text, ocr) for every page.
+
+        Without ``page_level``, pages are held back (text only) until the text
+        layer reaches ``min_document_chars``; from then on nothing is OCRed.
+        A document that never gets there is OCRed in full.
+        """
+        if self.page_level:
+            for page_number, text in pages:
+                yield page_number, text, self.needs_ocr(text)
+            return
+
+        held = []
+        text_chars = 0
+        for page_number, text in pages:
+            if held is None:
+                yield page_number, text, False
+                continue
+            held.append((page_number, text))
+            text_chars += len(text.strip())
+            if text_chars >= self.min_document_chars:
+                for held_page, held_text in held:
+                    yield held_page, held_text, False
+                held = None
+
+        for page_number, text in held or []:
+            yield page_number, text, True
+
+    def iter_pages(self, pdf_path: str, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) in page order, OCRing scanned pages in parallel.
+
+        ``pages`` yields each page's text layer. At most a few pages per worker
+        are in flight, so memory stays bounded however long the PDF is.
+        """
+        self.page_timings = []
+        max_pending = 4 * self.max_workers
+        pending = deque()
+        executor = None
+
+        try:
+            for page_number, text, ocr in self._plan(pages):
+                if ocr:
+                    # The pool is only started once a page actually needs OCR
+                    if executor is None:
+                        executor = self.executor_factory(max_workers=self.max_workers)
+                    future = executor.submit(_timed_ocr, self.ocr_fn, pdf_path, page_number, self.dpi)
+                    pending.append((page_number, text, future))
+                else:
+                    pending.append((page_number, text, None))
+
+                while pending and (pending[0][2] is None or pending[0][2].done()
+                                   or len(pending) >= max_pending):
+                    yield self._resolve(*pending.popleft())
+
+            while pending:
+                yield self._resolve(*pending.popleft())
+        finally:
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+    def _resolve(self, page_number: int, text: str, future) -> Tuple[int, str]:
+        if future is None:
+            self.page_timings.append({"page": page_number, "ocr": False, "seconds": 0.0})
+            return page_number, text
+
+        try:
+            ocr_text, seconds = future.result()
+        except Exception as e:
+            # One failed page must not abort the document: keep its text layer
+            print(f"⚠️ OCR failed on page {page_number}, using its text layer: {e}")
+            self.page_timings.append({"page": page_number, "ocr": False, "seconds": 0.0,
+                                      "ocr_error": str(e)})
+            return page_number, text
+
+        self.page_timings.append({"page": page_number, "ocr": True, "seconds": round(seconds, 3)})
+        print(f"🔎 OCR page {page_number}: {seconds:.2f}s")
+        return page_number, ocr_text
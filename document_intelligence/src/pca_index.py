@@ -0,0 +1,96 @@
+import numpy as np
+from typing import Tuple
+
+from config import PCA_DIM, PCA_CANDIDATES, PCA_MIN_TRAIN_SIZE
+
+# Upper bound on (rows x queries) reduced scores held at once
+_PREFILTER_BLOCK_ELEMENTS = 1 << 24
+
+
+class PCAPrefilterIndex:
+    """Coarse-to-fine search through a PCA-reduced copy of the vectors.
+
+    Stage 1 scores every chunk in ``dim`` dimensions (projections onto the
+    top principal components) to pick ``candidates`` chunks; stage 2
+    re-scores only those against the full vectors kept by the Retriever.
+    The mean term of the projection is the same for every chunk, so the
+    query is projected without centering.
+    """
+
+    def __init__(self, dim: int = PCA_DIM, candidates: int = PCA_CANDIDATES,
+                 min_train_size: int = PCA_MIN_TRAIN_SIZE, seed: int = 0):
+        self.dim = dim
+        self.candidates = candidates
+        self.min_train_size = min_train_size
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        self.components = None  # (d, dim)
+        self.reduced = np.empty((0, 0), dtype=np.float32)  # rows in use of _buffer
+        self._buffer = None
+
+    @property
+    def trained(self) -> bool:
+        return self.components is not None
+
+    def train(self, vectors: np.ndarray):
+        """Learn the top ``dim`` principal directions from a sample of ``vectors``"""
+        n, d = vectors.shape
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, 20_000)
+        sample = np.asarray(vectors[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+        sample = sample - sample.mean(axis=0)
+
+        # Eigenvectors of the d x d covariance are cheaper than an SVD of the sample
+        eigenvalues, eigenvectors = np.linalg.eigh(sample.T @ sample)
+        order = np.argsort(eigenvalues)[::-1][:min(self.dim, d)]
+        self.components = np.ascontiguousarray(eigenvectors[:, order], dtype=np.float32)
+        self.reduced = np.empty((0, len(order)), dtype=np.float32)
+        self._buffer = None
+
+        explained = eigenvalues[order].sum() / max(eigenvalues.sum(), 1e-10)
+        print(f"📉 PCA prefilter trained: {d} -> {len(order)} dims ({explained:.0%} of variance)")
+
+    def add(self, vectors: np.ndarray):
+        """Project newly appended vectors (in Retriever order)"""
+        projected = np.asarray(vectors, dtype=np.float32) @ self.components
+        count = len(self.reduced)
+        needed = count + len(projected)
+
+        # Grow geometrically so appending batch after batch stays linear overall
+        if self._buffer is None or needed > len(self._buffer):
+            buffer = np.empty((max(needed, 2 * count, 1024), projected.shape[1]), dtype=np.float32)
+            buffer[:count] = self.reduced
+            self._buffer = buffer
+
+        self._buffer[count:needed] = projected
+        self.reduced = self._buffer[:needed]
+
+    def search(self, vectors: np.ndarray, query_vecs: np.ndarray, top_k: int,
+               candidates: int = None) -> Tuple[list, list]:
+        """Top-k per query: reduced-dimension prefilter, then exact re-scoring"""
+        candidates = max(top_k, candidates or self.candidates)
+        reduced_queries = query_vecs @ self.components
+        group = max(1, _PREFILTER_BLOCK_ELEMENTS // max(len(self.reduced), 1))
+
+        all_ids, all_scores = [], []
+        for start in range(0, len(query_vecs), group):
+            coarse = self.reduced @ reduced_queries[start:start + group].T
+            k = min(candidates, len(coarse))
+            if k < len(coarse):
+                shortlist = np.argpartition(-coarse, k - 1, axis=0)[:k]
+            else:
+                shortlist = np.broadcast_to(np.arange(len(coarse))[:, None], coarse.shape)
+
+            for column, query_vec in enumerate(query_vecs[start:start + group]):
+                # Sorted ids keep reads from the full vectors sequential
+                ids = np.sort(shortlist[:, column])
+                exact = np.asarray(vectors[ids], dtype=np.float32) @ query_vec
+                n = min(top_k, len(exact))
+                best = np.argpartition(-exact, n - 1)[:n] if n < len(exact) else np.arange(len(exact))
+                best = best[np.argsort(-exact[best], kind="stable")]
+                all_ids.append(ids[best])
+                all_scores.append(exact[best])
+
+        return all_ids, all_scores
@@ -1,5 +1,6 @@
 import os
-import re
+import time
+from itertools import chain
 from typing import List
 
 from src.document_loader import DocumentLoader
@@ -8,73 +9,511 @@ from src.embeddings import EmbeddingModel
 from src.retriever import Retriever
 from src.qa_model import QAModel
 from src.pdf_highlighter import PDFHighlighter
-from config import MODEL_NAME, LOCAL_MODEL_PATH
+from src.ingestion_cache import IngestionCache
+from src.corpus_index import CorpusIndex
+from src.model_registry import ModelRegistry
+from src.context_packer import ContextPacker
+from src.entity_index import EntityIndex, find_entities
+from src.answer_cache import AnswerCache
+from config import (
+    MODEL_NAME, LOCAL_MODEL_PATH, LARGE_FILE, EMBED_BATCH_SIZE, STREAMING_EXTENSIONS, MODEL_WARMUP,
+    ANSWER_CACHE_ENABLED,
+)
+
+NOT_IN_DOCUMENT = "⚠️ The document does not contain this information."
 
 
 class DocumentPipeline:
-    def __init__(self):
+    def __init__(self, answer_cache: bool = ANSWER_CACHE_ENABLED):
         print("🚀 Initializing Hybrid RAG Pipeline...")
+        # Models are loaded on first use (or warmed in the background below)
+        self.models = ModelRegistry()
         self.loader = DocumentLoader()
         self.chunker = AdaptiveChunker()
-        self.embedder = EmbeddingModel()
+        self.embedder = EmbeddingModel(registry=self.models)
         self.retriever = Retriever(self.embedder)
-        self.qa = QAModel(MODEL_NAME, LOCAL_MODEL_PATH)
+        self.qa = QAModel(MODEL_NAME, LOCAL_MODEL_PATH, registry=self.models)
+        self.packer = ContextPacker(self.qa.count_tokens, self.qa.truncate_tokens,
+                                    sentence_chunker=self.chunker.sentence_chunker)
         self.highlighter = PDFHighlighter()
+        self.ingestion_cache = IngestionCache()
+        self.corpus = CorpusIndex(self.embedder)
+        # Emails, phones, dates and names of the current document, extracted at ingestion
+        self.entities = EntityIndex()
+        # Responses per index state; index_key names a complete document index, else index_version is used
+        self.answer_cache = AnswerCache() if answer_cache else None
+        self.index_version = 0
+        self.index_key = None
 
         self.current_doc = None
+        self.doc_hash = None
         self.current_text = ""
         self.chunks: List[str] = []
+        self.chunk_pages: List[int] = []
+        self.chunk_starts: List[int] = []  # chunk offsets in the cleaned document text
         self.index_built = False
 
+        if MODEL_WARMUP:
+            self.models.warm(MODEL_WARMUP)
+
+    def model_stats(self) -> dict:
+        """Per-model load state, load time and resident memory, plus generation and answer cache stats"""
+        return {
+            **self.models.summary(),
+            "generation": self.qa.generation_stats(),
+            "answer_cache": self.answer_cache.summary() if self.answer_cache is not None else {},
+        }
+
     # ================= DOCUMENT UPLOAD ================= #
-    def upload_document(self, file_path: str):
+    def upload_document(self, file_path: str, streaming: bool = None):
+        file_size = os.path.getsize(file_path) if os.path.exists(file_path) else None
+
+        # Large files (and zipped office formats) go through the page-wise streaming path by default
+        if streaming is None:
+            streaming = (bool(file_size) and file_size >= LARGE_FILE) or \
+                os.path.splitext(file_path)[1].lower() in STREAMING_EXTENSIONS
+
+        if streaming:
+            progress = {}
+            for progress in self.stream_document(file_path):
+                pass
+            return {
+                "chunks": progress.get("chunks", 0),
+                "chunk_size": progress.get("chunk_size"),
+                "metadata": progress.get("metadata", {}),
+            }
+
         print(f"📂 Loading document: {file_path}")
         self.current_doc = file_path
 
+        cache_key = self._cache_key(file_path, streaming=False)
+        cached = self.ingestion_cache.get(cache_key)
+        if cached is not None:
+            return self._restore_cached(cached, cache_key)
+
         text, metadata = self.loader.load_document(file_path)
         self.current_text = text
 
-        file_size = os.path.getsize(file_path) if os.path.exists(file_path) else None
         chunk_size = self.chunker.calculate_chunk_size(text, file_size)
 
-        self.chunks = self.chunker.chunk_text(text, chunk_size)
+        self.chunks, self.chunk_starts = self.chunker.chunk_text(text, chunk_size, with_starts=True)
+        self.chunk_pages = []
+        self.index_built = False
+        self.entities.build(self.chunks, chunk_starts=self.chunk_starts)
+        self._index_changed(cache_key)
 
         if self.chunks:
             embeddings = self.embedder.embed_chunks(self.chunks)
             self.retriever.build_index(self.chunks, embeddings)
             self.index_built = True
+            self.ingestion_cache.put(cache_key, text, metadata, self.chunks,
+                                     self.chunk_pages, chunk_size, self.retriever.embeddings,
+                                     ann=self.retriever.ann, chunk_starts=self.chunk_starts)
+
+        return {
+            "chunks": len(self.chunks),
+            "chunk_size": chunk_size,
+            "metadata": metadata,
+        }
+
+    def stream_document(self, file_path: str, batch_size: int = EMBED_BATCH_SIZE):
+        """Ingest a document page by page, yielding progress after every indexed batch.
+
+        Chunks are embedded ``batch_size`` at a time and appended to the index,
+        so the document is queryable as soon as the first batch is yielded.
+        """
+        print(f"📂 Streaming document: {file_path}")
+        self.current_doc = file_path
+
+        cache_key = self._cache_key(file_path, streaming=True)
+        cached = self.ingestion_cache.get(cache_key)
+        if cached is not None:
+            info = self._restore_cached(cached, cache_key)
+            info["pages"] = cached["chunk_pages"][-1] if cached["chunk_pages"] else 0
+            yield info
+            return
+
+        self.current_text = ""
+        self.retriever.reset()
+        self.entities.reset()
+        self.chunks = self.retriever.chunks
+        self.chunk_pages = []
+        self.chunk_starts = []
+        self.index_built = False
+        self._index_changed()
+
+        metadata = {}
+        pages, chunk_size = self._peek_chunk_size(file_path, self.loader.iter_pages(file_path, metadata))
+
+        batch, batch_pages, batch_starts = [], [], []
+        for chunk, page_number, start in self.chunker.iter_chunks(pages, chunk_size):
+            batch.append(chunk)
+            batch_pages.append(page_number)
+            batch_starts.append(start)
+            if len(batch) >= batch_size:
+                yield self._index_batch(batch, batch_pages, batch_starts, chunk_size, metadata)
+                batch, batch_pages, batch_starts = [], [], []
+
+        if batch:
+            yield self._index_batch(batch, batch_pages, batch_starts, chunk_size, metadata)
+        self.entities.finish()
+
+        if self.index_built:
+            self.ingestion_cache.put(cache_key, "", metadata, self.chunks, self.chunk_pages,
+                                     chunk_size, self.retriever.embeddings, ann=self.retriever.ann,
+                                     chunk_starts=self.chunk_starts)
+            self._index_changed(cache_key)
+
+    def _peek_chunk_size(self, file_path: str, pages):
+        """Pick the chunk size from the first ~5000 characters; returns (pages, chunk_size)"""
+        head = []
+        sample_len = 0
+        for page in pages:
+            head.append(page)
+            sample_len += len(page[1])
+            if sample_len >= 5000:
+                break
+
+        file_size = os.path.getsize(file_path) if os.path.exists(file_path) else None
+        sample = "".join(text for _, text in head)[:5000]
+        return chain(head, pages), self.chunker.calculate_chunk_size(sample, file_size)
+
+    def _index_batch(self, batch, batch_pages, batch_starts, chunk_size, metadata):
+        embeddings = self.embedder.embed_chunks(batch)
+        self.retriever.add_chunks(batch, embeddings)
+        self.entities.add(batch, batch_pages, batch_starts)
+        self.chunk_pages.extend(batch_pages)
+        self.chunk_starts.extend(batch_starts)
+        self.index_built = True
+        self._index_changed()
 
         return {
             "chunks": len(self.chunks),
+            "pages": batch_pages[-1],
             "chunk_size": chunk_size,
             "metadata": metadata,
         }
 
+    # ================= INGESTION CACHE ================= #
+    def _cache_key(self, file_path: str, streaming: bool) -> str:
+        """Content hash of the file plus every setting that shapes the index"""
+        self.doc_hash = self.ingestion_cache.file_hash(file_path)
+        settings = {
+            "mode": "stream" if streaming else "full",
+            "chunker": self.chunker.settings(),
+            "embedding_model": self.embedder.model_id,
+            "retriever": self.retriever.settings(),
+        }
+        return self.ingestion_cache.make_key(self.doc_hash, settings)
+
+    def _restore_cached(self, cached: dict, cache_key: str):
+        print("⚡ Restored document from ingestion cache")
+        self.current_text = cached["text"]
+        self.set_index(cached["chunks"], cached["embeddings"], cached["chunk_pages"], normalized=True,
+                       index_key=cache_key, ann=cached["ann"], chunk_starts=cached["chunk_starts"])
+
+        return {
+            "chunks": len(self.chunks),
+            "chunk_size": cached["chunk_size"],
+            "metadata": cached["metadata"],
+            "cached": True,
+        }
+
+    def set_index(self, chunks: List[str], embeddings, chunk_pages: List[int] = None,
+                  normalized: bool = False, index_key: str = None, ann=None,
+                  chunk_starts: List[int] = None):
+        """Replace the searchable chunks with precomputed chunks and embeddings.
+
+        ``index_key`` names the index content (e.g. its ingestion cache key)
+        so cached answers survive reloading the same index; ``ann`` is a
+        trained ANN index saved for these embeddings, reused without retraining.
+        ``chunk_starts`` are the chunks' offsets in the cleaned document text,
+        used to scan it for entities once; without them the chunks are
+        treated as consecutive.
+        """
+        self.chunks = chunks
+        self.chunk_pages = chunk_pages or []
+        self.chunk_starts = chunk_starts or []
+        self.index_built = False
+        self.entities.build(self.chunks, self.chunk_pages, chunk_starts)
+        self._index_changed(index_key)
+
+        if self.chunks:
+            self.retriever.build_index(self.chunks, embeddings, normalized=normalized, ann=ann)
+            self.index_built = True
+
+    # ================= ANSWER CACHE ================= #
+    def _index_changed(self, index_key: str = None):
+        """Start a new index state; answers cached for an unnamed previous state are dropped"""
+        if self.answer_cache is not None and self.index_key is None:
+            self.answer_cache.invalidate(self._answer_scope())
+        self.index_version += 1
+        self.index_key = index_key
+
+    def _answer_scope(self) -> str:
+        return self.index_key or f"index-v{self.index_version}"
+
+    def _cached_answer(self, scope: str, question: str):
+        """(cached response or None, question vector to hand to ``_cache_answer``)"""
+        if self.answer_cache is None or not self.index_built:
+            return None, None
+
+        start = time.perf_counter()
+        hit, vector = self.answer_cache.get(scope, question, embed=self.embedder.embed)
+        if hit is not None:
+            hit[2]["cache_lookup_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return hit, vector
+
+    def _cache_answer(self, scope: str, question: str, response, vector=None):
+        # Answers given while the index changed underneath are not cached
+        if self.answer_cache is not None and self.index_built and scope == self._answer_scope():
+            self.answer_cache.put(scope, question, response, vector=vector)
+
+    def _cache_stream(self, scope: str, question: str, vector, stream, chunks, debug_info: dict):
+        """Pass a stream through, caching the full answer once it has been consumed"""
+        deltas = []
+        for delta in stream:
+            deltas.append(delta)
+            yield delta
+        self._cache_answer(scope, question, ("".join(deltas), chunks, debug_info), vector)
+
+    # ================= CORPUS ================= #
+    def add_to_corpus(self, file_path: str, batch_size: int = EMBED_BATCH_SIZE):
+        """Append a document to the persistent corpus; returns its doc id.
+
+        Pages are chunked independently so every chunk keeps its page and
+        character span. A file whose content is already in the corpus is
+        not ingested again.
+        """
+        file_hash = self.ingestion_cache.file_hash(file_path)
+        existing = self.corpus.find_by_hash(file_hash)
+        if existing is not None:
+            print(f"⚡ Document already in corpus (id {existing})")
+            return existing
+
+        print(f"📂 Adding to corpus: {file_path}")
+        metadata = {}
+        pages, chunk_size = self._peek_chunk_size(file_path, self.loader.iter_pages(file_path, metadata))
+
+        def batches():
+            texts, chunk_pages, spans = [], [], []
+            for page_number, page_text in pages:
+                segmentation, page_spans = self.chunker.chunk_spans(page_text, chunk_size)
+                texts.extend(self.chunker.sentence_chunker.texts(segmentation, page_spans))
+                chunk_pages.extend([page_number] * len(page_spans))
+                spans.extend((span.start, span.end) for span in page_spans)
+
+                while len(texts) >= batch_size:
+                    yield (texts[:batch_size], self.embedder.embed_chunks(texts[:batch_size]),
+                           chunk_pages[:batch_size], spans[:batch_size])
+                    texts, chunk_pages, spans = texts[batch_size:], chunk_pages[batch_size:], spans[batch_size:]
+
+            if texts:
+                yield texts, self.embedder.embed_chunks(texts), chunk_pages, spans
+
+        return self.corpus.add_document(
+            os.path.basename(file_path), str(file_path), file_hash, batches(),
+            metadata={"chunk_size": chunk_size, **metadata},
+        )
+
+    def remove_from_corpus(self, doc_id: int) -> bool:
+        return self.corpus.remove_document(doc_id)
+
+    def chat_corpus(self, question: str, doc_ids: List[int] = None, top_k: int = 5,
+                    stream: bool = False):
+        """Answer from the corpus, optionally restricted to some document ids"""
+        if not self.corpus.documents():
+            answer = "❌ The corpus is empty. Add a document first."
+            return (iter([answer]) if stream else answer), [], {}
+
+        retrieved = self.corpus.get_relevant_chunks(question, top_k=top_k, doc_ids=doc_ids)
+        if stream:
+            return self.chat_stream(question, retrieved=retrieved)
+        return self.chat(question, retrieved=retrieved)
+
     # ================= HYBRID CHAT ================= #
-    def chat(self, question: str):
+    def retrieve_batch(self, questions: List[str], top_k: int = 5):
+        """Retrieve (chunks, scores) for many questions in one vectorised pass"""
         if not self.index_built:
-            return "❌ Please upload a document first.", [], {}
+            return [([], []) for _ in questions]
+        return self.retriever.get_relevant_chunks_batch(questions, top_k=top_k)
 
-        # 1️⃣ Retrieve relevant chunks
-        relevant_chunks, scores = self.retriever.get_relevant_chunks(question, top_k=5)
+    def chat_batch(self, questions: List[str], retrieved=None):
+        """Answer a list of questions, retrieving for all of them at once.
 
-        if not relevant_chunks:
-            return "⚠️ Answer not found in the document.", [], {}
+        Questions answered by the entity index or the answer cache skip
+        retrieval; questions that need the generative model are generated
+        together in length-bucketed batches instead of one ``generate`` call each.
+        """
+        hits = {}
+        vectors = {}
+        scope = None
+        if retrieved is None:
+            scope = self._answer_scope()
+            for i, question in enumerate(questions):
+                hit, vectors[i] = self._fast_answer(scope, question)
+                if hit is not None:
+                    hits[i] = hit
+            rest = [i for i in range(len(questions)) if i not in hits]
+            retrieved = dict(zip(rest, self.retrieve_batch([questions[i] for i in rest]) if rest else []))
+        else:
+            retrieved = dict(enumerate(retrieved))
+
+        results = {i: self._answer_without_generation(questions[i], r) for i, r in retrieved.items()}
+        pending = [i for i, result in results.items() if result[0] is None]
+
+        answers = self.qa.generate_answers(
+            [results[i][3] for i in pending], [questions[i] for i in pending],
+            complexities=[results[i][2]["query_complexity"] for i in pending],
+        )
+        generated = dict(zip(pending, zip(answers, self.qa.last_batch)))
+
+        responses = []
+        for i in range(len(questions)):
+            if i in hits:
+                responses.append(hits[i])
+                continue
+
+            answer, chunks, debug_info, _ = results[i]
+            if i in generated:
+                answer, generation = generated[i]
+                if len(answer.strip()) > 3:
+                    debug_info = {**debug_info, "model": "generative", "batched": True, **generation}
+                else:
+                    answer = NOT_IN_DOCUMENT
+            responses.append((answer, chunks, debug_info))
+            if scope is not None:
+                self._cache_answer(scope, questions[i], responses[-1], vectors.get(i))
+        return responses
+
+    def chat(self, question: str, retrieved=None):
+        """Answer a question; ``retrieved`` takes a precomputed (chunks, scores) pair"""
+        if retrieved is not None:
+            return self._chat(question, retrieved)
 
-        # 2️⃣ Filter chunks by keyword overlap
-        question_words = set(question.lower().split())
-        filtered_chunks = []
+        scope = self._answer_scope()
+        hit, vector = self._fast_answer(scope, question)
+        if hit is not None:
+            return hit
+
+        response = self._chat(question)
+        self._cache_answer(scope, question, response, vector)
+        return response
+
+    def _chat(self, question: str, retrieved=None):
+        answer, chunks, debug_info, context = self._answer_without_generation(question, retrieved)
+        if answer is not None:
+            return answer, chunks, debug_info
+
+        # ================= CONCEPTUAL QUESTIONS → GENERATIVE MODEL ================= #
+        answer = self.qa.generate_answer(context, question, debug_info["query_complexity"])
+
+        if len(answer.strip()) > 3:
+            return answer, chunks, {**debug_info, "model": "generative", **self.qa.last_generation}
 
-        for chunk in relevant_chunks:
-            chunk_words = set(chunk.lower().split())
-            if question_words.intersection(chunk_words):
-                filtered_chunks.append(chunk)
+        return NOT_IN_DOCUMENT, chunks, debug_info
 
-        if not filtered_chunks:
-            filtered_chunks = relevant_chunks[:2]
+    def chat_stream(self, question: str, retrieved=None):
+        """Like ``chat`` but the answer is an iterator of text deltas.
 
-        # 3️⃣ Build context
-        context = "\n\n".join(filtered_chunks[:2])[:2000]
+        Retrieval and the extractive/regex routes run before returning;
+        generative answers are streamed token by token as they are produced.
+        ``debug_info`` is filled in while the stream is consumed.
+        """
+        scope = vector = None
+        if retrieved is None:
+            scope = self._answer_scope()
+            hit, vector = self._fast_answer(scope, question)
+            if hit is not None:
+                answer, chunks, debug_info = hit
+                return iter([answer]), chunks, debug_info
+
+        answer, chunks, debug_info, context = self._answer_without_generation(question, retrieved)
+        if answer is not None:
+            if scope is not None:
+                self._cache_answer(scope, question, (answer, chunks, debug_info), vector)
+            return iter([answer]), chunks, debug_info
+
+        debug_info = {**debug_info, "model": "generative", "streamed": True}
+        stream = self._stream_generative(context, question, debug_info)
+        if scope is not None:
+            stream = self._cache_stream(scope, question, vector, stream, chunks, debug_info)
+        return stream, chunks, debug_info
+
+    def _stream_generative(self, context: str, question: str, debug_info: dict):
+        start = time.perf_counter()
+        streamed = []
+        for delta in self.qa.stream_answer(context, question, debug_info["query_complexity"]):
+            if not streamed:
+                debug_info["time_to_first_token"] = round(time.perf_counter() - start, 3)
+                debug_info.update(self.qa.last_generation)
+            streamed.append(delta)
+            yield delta
+        debug_info.update(self.qa.last_generation)
+        debug_info["generation_time"] = round(time.perf_counter() - start, 3)
+
+        if len("".join(streamed).strip()) <= 3:
+            debug_info["model"] = None
+            yield NOT_IN_DOCUMENT
+
+    def _fast_answer(self, scope: str, question: str):
+        """Entity index, then answer cache: (response or None, question vector or None)"""
+        hit = self._answer_from_entities(question)
+        if hit is not None:
+            return hit, None
+        return self._cached_answer(scope, question)
+
+    def _answer_from_entities(self, question: str):
+        """(answer, chunks, debug_info) from the entity index, or None.
+
+        No query embedding, retrieval or model call is involved; the chunks
+        are the ones the entities were extracted from.
+        """
+        if not self.index_built:
+            return None
+
+        start = time.perf_counter()
+        hit = self.entities.lookup(question, self.chunks)
+        if hit is None:
+            return None
+
+        answer, entities, fast_path = hit
+        chunks = [self.chunks[row] for row in dict.fromkeys(entity.chunk for entity in entities)]
+        return answer, chunks, {
+            "model": "entity_index",
+            "fast_path": fast_path,
+            "pages": [entity.page for entity in entities if entity.page is not None],
+            "lookup_us": round((time.perf_counter() - start) * 1e6, 1),
+        }
+
+    def _answer_without_generation(self, question: str, retrieved=None):
+        """Retrieve, build the context and try the routes that need no generation.
+
+        Returns (answer, chunks, debug_info, context); ``answer`` is None when
+        the question has to go to the generative model with ``context``.
+        """
+        # 1️⃣ Retrieve relevant chunks
+        if retrieved is None:
+            if not self.index_built:
+                return "❌ Please upload a document first.", [], {}, ""
+            retrieved = self.retriever.get_relevant_chunks(question, top_k=5)
+        relevant_chunks, scores = retrieved
+
+        if not relevant_chunks:
+            return "⚠️ Answer not found in the document.", [], {}, ""
+
+        # 2️⃣ Filter chunks by keyword overlap; hybrid retrieval already ranks BM25 matches in
+        filtered_chunks = relevant_chunks
+        if self.retriever.mode == "dense":
+            question_words = set(question.lower().split())
+            filtered_chunks = [chunk for chunk in relevant_chunks
+                               if question_words.intersection(chunk.lower().split())]
+            if not filtered_chunks:
+                filtered_chunks = relevant_chunks[:2]
+
+        # 3️⃣ Build context: whole, de-duplicated sentences in rank order within the token budget
+        context, context_stats = self.packer.pack(filtered_chunks)
+        debug_info = {"query_complexity": self.chunker.analyze_query_complexity(question), **context_stats}
 
         q = question.lower()
 
@@ -82,32 +521,24 @@ class DocumentPipeline:
         factual_keywords = ["phone", "number", "email", "name", "date", "contact"]
 
         if any(k in q for k in factual_keywords):
-            answer = self.qa.extract_answer(context, question)
-
-            # Regex fallback for phone/email
-            phone_pattern = r"\+?\d[\d\s\-]{7,}\d"
-            email_pattern = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
-
+            # Phone/email via the entity index patterns first: a match needs no model call
             if "phone" in q or "number" in q:
-                match = re.search(phone_pattern, context)
-                if match:
-                    return match.group(), filtered_chunks, {"model": "regex"}
+                phones = find_entities("phone", context)
+                if phones:
+                    return phones[0], filtered_chunks, {**debug_info, "model": "regex"}, context
 
             if "email" in q:
-                match = re.search(email_pattern, context)
-                if match:
-                    return match.group(), filtered_chunks, {"model": "regex"}
+                emails = find_entities("email", context)
+                if emails:
+                    return emails[0], filtered_chunks, {**debug_info, "model": "regex"}, context
 
+            # Every retrieved chunk is scored in one batched pass; the best span wins
+            answer = self.qa.extract_answer(filtered_chunks, question)
             if answer.strip():
-                return answer, filtered_chunks, {"model": "extractive"}
-
-        # ================= CONCEPTUAL QUESTIONS → GENERATIVE MODEL ================= #
-        answer = self.qa.generate_answer(context, question)
-
-        if len(answer.strip()) > 3:
-            return answer, filtered_chunks, {"model": "generative"}
+                debug_info = {**debug_info, "model": "extractive", **self.qa.last_extraction}
+                return answer, filtered_chunks, debug_info, context
 
-        return "⚠️ The document does not contain this information.", filtered_chunks, {}
+        return None, filtered_chunks, debug_info, context
 
     # ================= PDF HIGHLIGHT ================= #
     def highlight_keywords(self, keywords: str):
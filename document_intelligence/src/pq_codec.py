@@ -0,0 +1,175 @@
+import numpy as np
+from typing import Tuple
+
+from config import PQ_SUBVECTORS, PQ_RERANK, PQ_MIN_TRAIN_SIZE
+
+KSUB = 256  # centroids per subspace, so every sub-code fits in one uint8
+# Upper bound on (rows x queries) partial scores gathered at once
+_ADC_BLOCK_ELEMENTS = 1 << 22
+
+
+class ProductQuantizer:
+    """Product quantisation codec for unit-length embeddings.
+
+    Vectors are split into ``m`` sub-vectors; each subspace gets its own
+    256-centroid k-means codebook, so a vector is stored as ``m`` uint8 codes
+    (384 float32 dims with m=48: 1536 bytes -> 48 bytes). Inner products with
+    a query are approximated from per-subspace lookup tables (asymmetric
+    distance computation: the query itself is not quantised).
+    """
+
+    def __init__(self, m: int = PQ_SUBVECTORS, seed: int = 0):
+        self.m = m
+        self.seed = seed
+        self.ksub = KSUB
+        self.codebooks = None  # (m, KSUB, dsub)
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    @property
+    def code_bytes(self) -> int:
+        return self.m
+
+    def train(self, vectors: np.ndarray, iterations: int = 15):
+        n, dim = vectors.shape
+        if dim % self.m:
+            raise ValueError(f"Embedding dim {dim} is not divisible into {self.m} sub-vectors")
+        dsub = dim // self.m
+        ksub = min(KSUB, n)
+
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, max(KSUB * 64, 10_000))
+        sample = np.asarray(vectors[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+
+        codebooks = np.zeros((self.m, KSUB, dsub), dtype=np.float32)
+        for j in range(self.m):
+            sub = sample[:, j * dsub:(j + 1) * dsub]
+            centroids = sub[rng.choice(sample_size, ksub, replace=False)].copy()
+            for _ in range(iterations):
+                assign = self._nearest(sub, centroids)
+                counts = np.bincount(assign, minlength=ksub)
+                for t in range(dsub):
+                    sums = np.bincount(assign, weights=sub[:, t], minlength=ksub)
+                    np.divide(sums, counts, out=centroids[:, t], where=counts > 0)
+                # Re-seed empty centroids from random sample points
+                empty = np.flatnonzero(counts == 0)
+                if len(empty):
+                    centroids[empty] = sub[rng.choice(sample_size, len(empty), replace=False)]
+            codebooks[j, :ksub] = centroids
+
+        self.codebooks = codebooks
+        self.ksub = ksub
+        print(f"🗜️ PQ codec trained: {self.m} x {ksub} centroids from {sample_size} vectors")
+
+    @staticmethod
+    def _nearest(sub: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c)
+        distances = (centroids * centroids).sum(axis=1) - 2 * sub @ centroids.T
+        return np.argmin(distances, axis=1)
+
+    def encode(self, vectors: np.ndarray, block: int = 8_192) -> np.ndarray:
+        """(n, d) vectors -> (n, m) uint8 codes"""
+        dsub = self.codebooks.shape[2]
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for start in range(0, len(vectors), block):
+            rows = np.asarray(vectors[start:start + block], dtype=np.float32)
+            for j in range(self.m):
+                codes[start:start + len(rows), j] = self._nearest(
+                    rows[:, j * dsub:(j + 1) * dsub], self.codebooks[j, :self.ksub])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.concatenate([self.codebooks[j][codes[:, j]] for j in range(self.m)], axis=1)
+
+    def lookup_tables(self, query_vecs: np.ndarray) -> np.ndarray:
+        """(m, KSUB, nq) inner products of each query sub-vector with each centroid"""
+        dsub = self.codebooks.shape[2]
+        subs = query_vecs.reshape(len(query_vecs), self.m, dsub)
+        return np.einsum("jkd,qjd->jkq", self.codebooks, subs, optimize=True)
+
+    def adc_scores(self, codes_t: np.ndarray, tables: np.ndarray) -> np.ndarray:
+        """Approximate (n, nq) inner products from transposed (m, n) codes"""
+        n, nq = codes_t.shape[1], tables.shape[2]
+        scores = np.zeros((n, nq), dtype=np.float32)
+        block = max(1, _ADC_BLOCK_ELEMENTS // nq)
+        for start in range(0, n, block):
+            out = scores[start:start + block]
+            for j in range(self.m):
+                out += tables[j][codes_t[j, start:start + block]]
+        return scores
+
+
+class PQIndex:
+    """Retriever index that searches product-quantised codes.
+
+    Every chunk is held as ``m`` bytes in RAM. A query scores all codes with
+    lookup tables, then re-scores the best ``rerank`` candidates exactly
+    against the full vectors, which the Retriever spills to a disk-backed
+    memory map so only the touched rows are paged in.
+    """
+
+    spills_vectors = True
+
+    def __init__(self, m: int = PQ_SUBVECTORS, rerank: int = PQ_RERANK,
+                 min_train_size: int = PQ_MIN_TRAIN_SIZE, seed: int = 0):
+        self.codec = ProductQuantizer(m=m, seed=seed)
+        self.rerank = rerank
+        self.min_train_size = min_train_size
+        self.reset()
+
+    def reset(self):
+        self.codec.codebooks = None
+        self.codes_t = np.empty((self.codec.m, 0), dtype=np.uint8)  # columns in use of _buffer
+        self._buffer = None
+
+    @property
+    def trained(self) -> bool:
+        return self.codec.trained
+
+    def train(self, vectors: np.ndarray):
+        self.codec.train(vectors)
+        self.codes_t = np.empty((self.codec.m, 0), dtype=np.uint8)
+        self._buffer = None
+
+    def add(self, vectors: np.ndarray):
+        """Encode newly appended vectors (in Retriever order)"""
+        codes = self.codec.encode(vectors).T
+        count = self.codes_t.shape[1]
+        needed = count + codes.shape[1]
+
+        # Grow geometrically so appending batch after batch stays linear overall
+        if self._buffer is None or needed > self._buffer.shape[1]:
+            buffer = np.empty((self.codec.m, max(needed, 2 * count, 1024)), dtype=np.uint8)
+            buffer[:, :count] = self.codes_t
+            self._buffer = buffer
+
+        self._buffer[:, count:needed] = codes
+        self.codes_t = self._buffer[:, :needed]
+
+    def memory_bytes(self) -> int:
+        return self.codes_t.nbytes + self.codec.codebooks.nbytes
+
+    def search(self, vectors: np.ndarray, query_vecs: np.ndarray, top_k: int,
+               rerank: int = None) -> Tuple[list, list]:
+        """Top-k per query: ADC over all codes, exact re-scoring of the best ``rerank``"""
+        rerank = max(top_k, rerank if rerank is not None else self.rerank)
+        approx = self.codec.adc_scores(self.codes_t, self.codec.lookup_tables(query_vecs))
+
+        all_ids, all_scores = [], []
+        for column, query_vec in enumerate(query_vecs):
+            scores = approx[:, column]
+            k = min(rerank, len(scores))
+            candidates = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+            # Sorted ids keep reads from the spilled vectors sequential
+            candidates = np.sort(candidates)
+
+            exact = np.asarray(vectors[candidates], dtype=np.float32) @ query_vec
+            k = min(top_k, len(exact))
+            best = np.argpartition(-exact, k - 1)[:k] if k < len(exact) else np.arange(len(exact))
+            best = best[np.argsort(-exact[best], kind="stable")]
+            all_ids.append(candidates[best])
+            all_scores.append(exact[best])
+
+        return all_ids, all_scores
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import PREFIX_CACHE_MAX_TOKENS
+
+
+class PrefixKVCache:
+    """LRU cache of prefilled ``past_key_values`` keyed by prefix token ids.
+
+    Entries hold the prefix token ids and the model's KV cache for them. The
+    cache is bounded by the total number of cached tokens, since KV memory
+    grows linearly with prefix length. ``generate`` extends a KV cache in
+    place, so a caller ``acquire``s an entry, crops it back to the prefix when
+    done and ``release``s it; an entry held by another generation is copied.
+    """
+
+    def __init__(self, max_tokens: int = PREFIX_CACHE_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self._entries = OrderedDict()
+        self._tokens = 0
+        self._busy = set()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "prompt_tokens": 0, "prefill_tokens_saved": 0}
+
+    @staticmethod
+    def key(token_ids) -> str:
+        return hashlib.sha1(token_ids.cpu().numpy().tobytes()).hexdigest()
+
+    def acquire(self, key: str) -> bool:
+        """Claim an entry's KV cache for one generation; False if another holds it"""
+        with self._lock:
+            if key in self._busy:
+                return False
+            self._busy.add(key)
+            return True
+
+    def release(self, key: str):
+        with self._lock:
+            self._busy.discard(key)
+
+    def get(self, key: str):
+        """(token ids, past_key_values) for ``key`` or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, key: str, token_ids, past_key_values):
+        length = token_ids.shape[-1]
+        if length > self.max_tokens:
+            return
+        if key in self._entries:
+            self._tokens -= self._entries.pop(key)[0].shape[-1]
+
+        self._entries[key] = (token_ids, past_key_values)
+        self._tokens += length
+        while self._tokens > self.max_tokens:
+            _, (evicted_ids, _) = self._entries.popitem(last=False)
+            self._tokens -= evicted_ids.shape[-1]
+
+    def record(self, prompt_tokens: int, reused_tokens: int):
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["prefill_tokens_saved"] += reused_tokens
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens = 0
+
+    def summary(self) -> dict:
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["saved_fraction"] = (
+            round(stats["prefill_tokens_saved"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0
+        )
+        stats["entries"] = len(self._entries)
+        stats["cached_tokens"] = self._tokens
+        return stats
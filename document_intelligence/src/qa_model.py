@@ -1,72 +1,427 @@
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+import copy
+import time
+from threading import Thread
+
+from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer
 import torch
 
+from config import (
+    GENERATION_BATCH_SIZE, PREFIX_CACHE_ENABLED, GENERATOR_VARIANT,
+    EXTRACTIVE_BATCH_SIZE, EXTRACTIVE_DOC_STRIDE, EXTRACTIVE_MAX_SEQ_LEN,
+)
+from src.model_artifacts import read_manifest, choose_variant, load_variant
+from src.prefix_cache import PrefixKVCache
+from src.model_registry import ModelRegistry
+from src.generation_policy import GenerationPolicy
+
+# Fixed instruction header shared by every generative prompt
+PROMPT_HEADER = """
+You are an AI assistant. Answer ONLY using the given document.
+
+Document:
+"""
+
 
 class QAModel:
-    def __init__(self, model_name=None, model_path=None):
-        print("⚡ Loading Extractive QA model (DistilBERT)...")
+    def __init__(self, model_name=None, model_path=None, prefix_cache: bool = PREFIX_CACHE_ENABLED,
+                 registry: ModelRegistry = None):
+        self.model_name = model_name
+        self.model_path = model_path
+        self.device = 0 if torch.cuda.is_available() else -1
+        self.generator_variant = None
 
-        device = 0 if torch.cuda.is_available() else -1
+        # Models load on first use; the generative model is unloaded again when idle
+        self.registry = registry or ModelRegistry()
+        self.registry.register("extractive", self._load_extractive)
+        self.registry.register("generator_tokenizer", self._load_tokenizer)
+        self.registry.register("generator", self._load_generator, evict_when_idle=True,
+                               on_unload=self._on_generator_unload)
+
+        # Prefilled KV caches for the header and header + context prompt prefixes
+        self.prefix_cache = PrefixKVCache() if prefix_cache else None
+        # Token budget, decoding mode and stop criteria per query complexity
+        self.policy = GenerationPolicy()
+        self.last_generation = {}
+        self.last_batch = []
+        self.last_extraction = {}
+
+    @property
+    def extractive_qa(self):
+        return self.registry.get("extractive")
+
+    @property
+    def gen_tokenizer(self):
+        return self.registry.get("generator_tokenizer")
+
+    @property
+    def gen_model(self):
+        return self.registry.get("generator")
+
+    def _load_extractive(self):
+        print("⚡ Loading Extractive QA model (DistilBERT)...")
 
         # Extractive QA model (FAST)
-        self.extractive_qa = pipeline(
+        return pipeline(
             "question-answering",
             model="distilbert-base-cased-distilled-squad",
-            device=device
+            device=self.device
         )
 
-        print("🤖 Loading Generative Model (Phi-3)...")
-
-        self.gen_tokenizer = AutoTokenizer.from_pretrained(
-            model_path,
+    def _load_tokenizer(self):
+        return AutoTokenizer.from_pretrained(
+            self.model_path,
             trust_remote_code=True
         )
 
-        self.gen_model = AutoModelForCausalLM.from_pretrained(
-            model_path,
+    def _load_generator(self):
+        # Prepared artifacts (see download_model.py) come with a manifest of variants
+        manifest = read_manifest(self.model_path) if self.model_path else None
+        if manifest is not None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.generator_variant = choose_variant(manifest, device, GENERATOR_VARIANT)
+            print(f"🤖 Loading Generative Model (Phi-3, {self.generator_variant})...")
+            return load_variant(self.model_path, self.generator_variant, device)
+
+        print("🤖 Loading Generative Model (Phi-3)...")
+        self.generator_variant = None
+
+        return AutoModelForCausalLM.from_pretrained(
+            self.model_path,
             trust_remote_code=True,
             torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
             device_map="auto"
         )
 
-        print("✅ Hybrid QA Models Loaded")
+    def _on_generator_unload(self):
+        # Cached KV tensors belong to the unloaded model
+        if self.prefix_cache is not None:
+            self.prefix_cache.clear()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
 
     # ================= EXTRACTIVE ANSWER ================= #
-    def extract_answer(self, context, question):
-        try:
-            result = self.extractive_qa(
-                question=question,
-                context=context[:2000]
-            )
-            return result["answer"]
-        except:
+    def extract_answer(self, contexts, question, batch_size=EXTRACTIVE_BATCH_SIZE):
+        """Best answer span across ``contexts`` (one context or a list of chunks).
+
+        Chunks go through the pipeline ``batch_size`` at a time, each slice
+        timed on its own; chunks longer than the model window are split with
+        ``doc_stride`` overlap. The highest-scoring span wins; stats are left
+        in ``last_extraction``.
+        """
+        if isinstance(contexts, str):
+            contexts = [contexts]
+        contexts = [c for c in contexts if c.strip()]
+        self.last_extraction = {}
+        if not contexts:
             return ""
+        # A misconfigured window would fail every call; surface it instead of "not found"
+        if EXTRACTIVE_DOC_STRIDE >= EXTRACTIVE_MAX_SEQ_LEN:
+            raise ValueError(f"EXTRACTIVE_DOC_STRIDE ({EXTRACTIVE_DOC_STRIDE}) must be smaller "
+                             f"than EXTRACTIVE_MAX_SEQ_LEN ({EXTRACTIVE_MAX_SEQ_LEN})")
+
+        results = []
+        chunk_ids = []
+        latencies = []
+        for i in range(0, len(contexts), batch_size):
+            batch = contexts[i:i + batch_size]
+            start = time.perf_counter()
+            try:
+                batch_results = self.extractive_qa(
+                    question=[question] * len(batch),
+                    context=batch,
+                    batch_size=batch_size,
+                    doc_stride=EXTRACTIVE_DOC_STRIDE,
+                    max_seq_len=EXTRACTIVE_MAX_SEQ_LEN,
+                )
+            except Exception as e:
+                print(f"⚠️ Extractive QA failed on chunks {i}-{i + len(batch) - 1}, skipping them: {e}")
+                continue
+            latencies.append(time.perf_counter() - start)
+
+            # A single question/context pair comes back as a dict
+            if isinstance(batch_results, dict):
+                batch_results = [batch_results]
+            results.extend(batch_results)
+            chunk_ids.extend(range(i, i + len(batch)))
+
+        if not results:
+            return ""
+        best = max(range(len(results)), key=lambda i: results[i]["score"])
+
+        self.last_extraction = {
+            "extractive_chunks": len(contexts),
+            "extractive_best_chunk": chunk_ids[best],
+            "extractive_score": round(float(results[best]["score"]), 4),
+            "extractive_time": round(sum(latencies), 3),
+            "extractive_batch_latency": [round(seconds, 3) for seconds in latencies],
+        }
+        return results[best]["answer"]
 
     # ================= GENERATIVE ANSWER ================= #
-    def generate_answer(self, context, question):
-        prompt = f"""
-You are an AI assistant. Answer ONLY using the given document.
+    @staticmethod
+    def build_prompt(context, question):
+        return PROMPT_HEADER + QAModel._context_part(context) + QAModel._question_part(question)
 
-Document:
-{context}
+    @staticmethod
+    def _context_part(context):
+        return f"{context}\n\nQuestion:\n"
 
-Question:
-{question}
+    @staticmethod
+    def _question_part(question):
+        return f"{question}\n\nAnswer:\n"
 
-Answer:
-"""
+    def _generation_inputs(self, context, question):
+        """(inputs for ``generate``, release callback), with cached prefix KV when enabled.
+
+        The prompt is always tokenised whole, so the model sees the same ids
+        with or without the cache; cached prefixes are leading slices of those
+        ids, cut at the header and context boundaries by character offsets.
+        Call the release callback once ``generate`` has returned.
+        """
+        prompt = self.build_prompt(context, question)
+        if self.prefix_cache is not None:
+            try:
+                encoded = self.gen_tokenizer(prompt, return_tensors="pt", return_offsets_mapping=True)
+            except (NotImplementedError, ValueError):
+                # Slow tokenizers have no offsets: generate without the cache
+                encoded = None
+            if encoded is not None:
+                return self._cached_inputs(context, encoded)
+
+        inputs = self.gen_tokenizer(prompt, return_tensors="pt")
+        self.last_generation = {"prompt_tokens": inputs["input_ids"].shape[1], "prefill_tokens_saved": 0}
+        return inputs.to(self.gen_model.device), lambda: None
 
-        inputs = self.gen_tokenizer(prompt, return_tensors="pt").to(self.gen_model.device)
+    @staticmethod
+    def _tokens_before(offsets, boundary):
+        """Number of leading tokens that end at or before character ``boundary``"""
+        count = 0
+        for _, end in offsets.tolist():
+            if end > boundary:
+                break
+            count += 1
+        return count
 
-        outputs = self.gen_model.generate(
-            **inputs,
-            max_new_tokens=120,
-            temperature=0.3,
-            do_sample=True
+    def _cached_inputs(self, context, encoded):
+        input_ids = encoded["input_ids"].to(self.gen_model.device)
+        offsets = encoded["offset_mapping"][0]
+        # At least one prompt token is left for generate() to prefill
+        prefix_length = min(self._tokens_before(offsets, len(PROMPT_HEADER + self._context_part(context))),
+                            input_ids.shape[1] - 1)
+        header_length = min(self._tokens_before(offsets, len(PROMPT_HEADER)), prefix_length)
+
+        key, past_key_values, reused = self._cached_prefix(input_ids, header_length, prefix_length)
+        self.prefix_cache.record(input_ids.shape[1], reused)
+        self.last_generation = {"prompt_tokens": input_ids.shape[1], "prefill_tokens_saved": reused}
+
+        # generate() extends the KV cache in place: crop it back afterwards
+        # instead of copying it, unless another generation is using it
+        if hasattr(past_key_values, "crop") and self.prefix_cache.acquire(key):
+            def release():
+                past_key_values.crop(prefix_length)
+                self.prefix_cache.release(key)
+        else:
+            past_key_values = copy.deepcopy(past_key_values)
+            release = lambda: None
+
+        # generate() only prefills the tokens past the cache: the question suffix
+        return {
+            "input_ids": input_ids,
+            "attention_mask": torch.ones_like(input_ids),
+            "past_key_values": past_key_values,
+        }, release
+
+    def count_tokens(self, texts):
+        """Generator token counts of ``texts``, tokenised as one batch"""
+        encoded = self.gen_tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def truncate_tokens(self, text, max_tokens):
+        """The leading ``max_tokens`` generator tokens of ``text``, decoded back to text"""
+        ids = self.gen_tokenizer(text, add_special_tokens=False)["input_ids"]
+        return self.gen_tokenizer.decode(ids[:max_tokens], skip_special_tokens=True).strip()
+
+    @torch.no_grad()
+    def _prefill(self, input_ids, past_key_values=None):
+        outputs = self.gen_model(
+            input_ids=input_ids,
+            past_key_values=past_key_values,
+            use_cache=True,
         )
+        return outputs.past_key_values
+
+    def _cached_prefix(self, input_ids, header_length, prefix_length):
+        """(cache key, KV cache, tokens reused) for the first ``prefix_length`` prompt ids.
+
+        A repeated context reuses its whole prefix; a new context starts from
+        the cached header and only prefills the context tokens.
+        """
+        prefix_ids = input_ids[:, :prefix_length]
+        key = self.prefix_cache.key(prefix_ids)
+        entry = self.prefix_cache.get(key)
+        if entry is not None:
+            return key, entry[1], prefix_length
+
+        header_ids = input_ids[:, :header_length]
+        header_key = self.prefix_cache.key(header_ids)
+        header = self.prefix_cache.get(header_key)
+        reused = 0
+        if header is None:
+            header = (header_ids, self._prefill(header_ids))
+            self.prefix_cache.put(header_key, *header)
+        else:
+            reused = header_length
+
+        # Only the short header KV is copied; the context is prefilled onto the copy
+        past_key_values = self._prefill(input_ids[:, header_length:prefix_length], copy.deepcopy(header[1]))
+        self.prefix_cache.put(key, prefix_ids, past_key_values)
+        return key, past_key_values, reused
+
+    def prefix_cache_stats(self):
+        return self.prefix_cache.summary() if self.prefix_cache is not None else {}
+
+    def generation_stats(self):
+        """Mean generated tokens and generation time per query complexity"""
+        return self.policy.summary()
+
+    def generate_answer(self, context, question, complexity="medium"):
+        # Held for the whole call: the idle reaper must not unload the model or its prefix cache
+        with self.registry.in_use("generator"):
+            inputs, release = self._generation_inputs(context, question)
+            prompt_length = inputs["input_ids"].shape[1]
+
+            start = time.perf_counter()
+            try:
+                outputs = self.gen_model.generate(
+                    **inputs, **self.policy.generation_kwargs(self.gen_tokenizer, prompt_length, complexity)
+                )
+            finally:
+                release()
+            seconds = time.perf_counter() - start
+
+        # Decode only the new tokens: the prompt is sliced off by length
+        new_tokens = outputs[0][prompt_length:]
+        answer = self.gen_tokenizer.decode(new_tokens, skip_special_tokens=True)
+        self.last_generation.update(self.policy.record(complexity, len(new_tokens), seconds))
+        return self.policy.trim(answer, complexity).strip()
 
-        answer = self.gen_tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return answer.split("Answer:")[-1].strip()
+    def generate_answers(self, contexts, questions, batch_size=GENERATION_BATCH_SIZE, complexities=None):
+        """Generate answers for many (context, question) pairs in padded batches.
 
+        Prompts are grouped by query complexity (each class has its own
+        decoding settings), then sorted by token length and batched in that
+        order, so each batch holds prompts of similar length and little
+        padding. Batches are left-padded so every prompt ends where generation
+        starts. Answers are returned in input order; per-answer generation
+        stats are left in ``last_batch``.
+        """
+        prompts = [self.build_prompt(c, q) for c, q in zip(contexts, questions)]
+        self.last_batch = [{} for _ in prompts]
+        if not prompts:
+            return []
 
+        complexities = complexities or ["medium"] * len(prompts)
+        lengths = [len(ids) for ids in self.gen_tokenizer(prompts)["input_ids"]]
+        order = sorted(range(len(prompts)), key=lambda i: (complexities[i], lengths[i]))
 
+        buckets = []
+        for i in order:
+            if buckets and len(buckets[-1]) < batch_size and complexities[buckets[-1][0]] == complexities[i]:
+                buckets[-1].append(i)
+            else:
+                buckets.append([i])
+
+        tokenizer = self.gen_tokenizer
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        padding_side = tokenizer.padding_side
+        tokenizer.padding_side = "left"
+
+        answers = [None] * len(prompts)
+        with self.registry.in_use("generator"):
+            try:
+                for bucket in buckets:
+                    complexity = complexities[bucket[0]]
+                    inputs = tokenizer([prompts[i] for i in bucket], return_tensors="pt", padding=True)
+                    inputs = inputs.to(self.gen_model.device)
+                    prompt_length = inputs["input_ids"].shape[1]
+
+                    start = time.perf_counter()
+                    outputs = self.gen_model.generate(
+                        **inputs, **self.policy.generation_kwargs(tokenizer, prompt_length, complexity),
+                        pad_token_id=tokenizer.pad_token_id,
+                    )
+                    seconds = time.perf_counter() - start
+
+                    new_tokens = outputs[:, prompt_length:]
+                    # Finished rows are padded to the longest row
+                    token_counts = (new_tokens != tokenizer.pad_token_id).sum(dim=1).tolist()
+                    texts = tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+                    for i, text, count in zip(bucket, texts, token_counts):
+                        answers[i] = self.policy.trim(text, complexity).strip()
+                        self.last_batch[i] = self.policy.record(complexity, count, seconds)
+            finally:
+                tokenizer.padding_side = padding_side
+
+        return answers
+
+    def stream_answer(self, context, question, complexity="medium"):
+        """Yield the answer as text deltas while it is being generated.
+
+        ``generate`` runs in a background thread feeding a TextIteratorStreamer;
+        the prompt is skipped by the streamer, so only answer text is yielded.
+        Text that could be the start of a stop string is held back until it
+        is known not to be one.
+        """
+        with self.registry.in_use("generator"):
+            inputs, release = self._generation_inputs(context, question)
+            prompt_length = inputs["input_ids"].shape[1]
+            kwargs = self.policy.generation_kwargs(self.gen_tokenizer, prompt_length, complexity)
+            streamer = TextIteratorStreamer(self.gen_tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+            errors = []
+            outputs = []
+            start = time.perf_counter()
+
+            def generate():
+                # The thread holds the model too, in case the consumer abandons the stream
+                try:
+                    with self.registry.in_use("generator") as model:
+                        outputs.append(model.generate(**inputs, **kwargs, streamer=streamer))
+                except Exception as e:
+                    errors.append(e)
+                    # Unblock the consumer waiting on the streamer
+                    streamer.end()
+                finally:
+                    release()
+
+            thread = Thread(target=generate, daemon=True)
+            thread.start()
+
+        text = ""
+        emitted = 0
+        stopped = False
+        for delta in streamer:
+            if stopped:
+                continue
+            # Mirror generate_answer, which strips leading whitespace
+            text = (text + delta).lstrip()
+            answer = self.policy.trim(text, complexity)
+            stopped = len(answer) < len(text)
+            end = len(answer) if stopped else len(answer) - self.policy.partial_stop(answer)
+            if end > emitted:
+                yield answer[emitted:end]
+                emitted = end
+
+        thread.join()
+        if errors:
+            raise errors[0]
+
+        answer = self.policy.trim(text, complexity).rstrip()
+        if len(answer) > emitted:
+            yield answer[emitted:]
+
+        generated_tokens = outputs[0].shape[1] - prompt_length if outputs else 0
+        self.last_generation.update(
+            self.policy.record(complexity, generated_tokens, time.perf_counter() - start)
+        )
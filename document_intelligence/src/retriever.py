@@ -1,31 +1,318 @@
+import os
+import tempfile
+import weakref
+
 import numpy as np
 from typing import List, Tuple
 
+from config import RETRIEVER_DTYPE, RETRIEVER_INDEX, RETRIEVAL_MODE, RRF_K, RRF_CANDIDATES, PQ_SPILL_DIR
+from src.ann_index import IVFIndex
+from src.pq_codec import PQIndex
+from src.pca_index import PCAPrefilterIndex
+from src.lexical_index import BM25Index
+
+# Rows scored per block when float16 storage has to be upcast for BLAS
+_SCORE_BLOCK = 4_096
+# Upper bound on chunk x query scores held at once by batched retrieval
+_BATCH_SCORE_ELEMENTS = 1 << 25
+
+
+def _remove_spill(path: str, mapping):
+    """Unmap a spill file, then delete it (Windows cannot remove a mapped file)"""
+    try:
+        mapping.close()
+    except (BufferError, ValueError):
+        # Still referenced elsewhere: the OS keeps the mapping alive (POSIX) or refuses (Windows)
+        pass
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
 
 class Retriever:
-    def __init__(self, embedder):
+    def __init__(self, embedder, dtype: str = RETRIEVER_DTYPE, index_type: str = RETRIEVER_INDEX,
+                 mode: str = RETRIEVAL_MODE):
+        if mode not in ("dense", "hybrid"):
+            raise ValueError(f"Unsupported retrieval mode: {mode}")
         self.embedder = embedder
+        self.dtype = np.dtype(dtype)
+        self.index_type = index_type
+        self.mode = mode
+        self.ann = self._make_ann(index_type)
+        self.lexical = BM25Index() if mode == "hybrid" else None
+        self.chunks = []
+        self.embeddings = None  # L2-normalised rows stored as self.dtype
+        self._buffer = None
+        self._spill = None  # weakref.finalize that unmaps and deletes the current spill file
+
+    @staticmethod
+    def _make_ann(index_type: str):
+        """Approximate index for ``index_type``; None means exact search only"""
+        if index_type == "exact":
+            return None
+        if index_type == "ivf":
+            return IVFIndex()
+        if index_type == "pq":
+            return PQIndex()
+        if index_type == "pca":
+            return PCAPrefilterIndex()
+        raise ValueError(f"Unsupported retriever index: {index_type}")
+
+    def settings(self) -> dict:
+        """Tunables that change the stored vectors or the saved ANN index"""
+        settings = {"index": self.index_type, "dtype": self.dtype.name}
+        if isinstance(self.ann, IVFIndex):
+            settings["ivf"] = self._ivf_params(self.ann)
+        return settings
+
+    @staticmethod
+    def _ivf_params(ann: IVFIndex) -> dict:
+        return {"nlist": ann.nlist, "nprobe": ann.nprobe, "min_train_size": ann.min_train_size, "seed": ann.seed}
+
+    def reset(self):
         self.chunks = []
         self.embeddings = None
+        self._buffer = None
+        self._release_spill()
+        if self.ann is not None:
+            self.ann.reset()
+        if self.lexical is not None:
+            self.lexical.reset()
+
+    def build_index(self, chunks, embeddings, normalized: bool = False, ann=None):
+        """Index chunks; pass ``normalized=True`` for vectors that already have unit length.
 
-    def build_index(self, chunks, embeddings):
+        ``ann`` is a trained index saved for these same embeddings (e.g. by
+        the ingestion cache); when it matches, it is used instead of retraining.
+        """
         self.chunks = chunks
-        self.embeddings = np.array(embeddings)
+        self._buffer = None
+        self.embeddings = self._prepare(embeddings, normalized)
+        self._release_spill()
+        if self._spills and not isinstance(self.embeddings, np.memmap):
+            spilled = self._allocate(len(self.embeddings), self.embeddings.shape[1])
+            spilled[:] = self.embeddings
+            self.embeddings = spilled
+        if self._reusable(ann):
+            ann.nprobe = self.ann.nprobe
+            self.ann = ann
+        elif self.ann is not None:
+            self.ann.reset()
+            self._update_ann(len(self.embeddings))
+        if self.lexical is not None:
+            self.lexical.reset()
+            self.lexical.add(chunks)
         print(f"✅ Index built with {len(chunks)} chunks")
 
-    def get_relevant_chunks(self, query: str, top_k: int = 3) -> Tuple[List[str], List[float]]:
+    def add_chunks(self, chunks, embeddings):
+        """Append a batch of chunks to the index so they are searchable immediately"""
+        embeddings = self._prepare(embeddings, normalized=False)
+        count = len(self.chunks)
+        needed = count + len(embeddings)
+
+        # Grow geometrically so appending batch after batch stays linear overall
+        previous_spill = self._spill
+        if self._buffer is None or needed > len(self._buffer):
+            capacity = max(needed, 2 * count, 1024)
+            buffer = self._allocate(capacity, embeddings.shape[1])
+            if count:
+                buffer[:count] = self.embeddings
+            self._buffer = buffer
+
+        self._buffer[count:needed] = embeddings
+        self.chunks.extend(chunks)
+        self.embeddings = self._buffer[:needed]
+        if previous_spill is not None and previous_spill is not self._spill:
+            previous_spill()
+        self._update_ann(len(embeddings))
+        if self.lexical is not None:
+            self.lexical.add(chunks)
+
+    def _reusable(self, ann) -> bool:
+        """True when a saved ``ann`` index was trained for this retriever's index, params and vectors"""
+        if not (ann is not None and type(ann) is type(self.ann) and ann.trained
+                and len(ann.assignments) == len(self.embeddings)):
+            return False
+        # nprobe is a query-time setting and is taken from this retriever on reuse
+        saved, current = self._ivf_params(ann), self._ivf_params(self.ann)
+        saved.pop("nprobe")
+        current.pop("nprobe")
+        return saved == current
+
+    @property
+    def _spills(self) -> bool:
+        return getattr(self.ann, "spills_vectors", False)
+
+    def _allocate(self, rows: int, dim: int) -> np.ndarray:
+        """Vector storage: in RAM, or a disk-backed memmap for indexes that keep codes in RAM"""
+        if not self._spills:
+            return np.empty((rows, dim), dtype=self.dtype)
+
+        PQ_SPILL_DIR.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".npy", dir=PQ_SPILL_DIR)
+        os.close(fd)
+        mapped = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(rows, dim))
+        # Runs on release, when the Retriever is collected, or at interpreter exit
+        self._spill = weakref.finalize(self, _remove_spill, path, mapped._mmap)
+        return mapped
+
+    def _release_spill(self):
+        """Delete the spill file; callers drop their references to its vectors first"""
+        spill, self._spill = self._spill, None
+        if spill is not None:
+            spill()
+
+    def _update_ann(self, new_count: int):
+        """Keep the ANN index in step after ``new_count`` vectors were appended.
+
+        Until enough vectors exist to train it, searches fall back to exact.
+        """
+        if self.ann is None:
+            return
+        if self.ann.trained:
+            self.ann.add(self.embeddings[len(self.embeddings) - new_count:])
+        elif len(self.embeddings) >= self.ann.min_train_size:
+            self.ann.train(self.embeddings)
+            self.ann.add(self.embeddings)
+
+    def _prepare(self, embeddings, normalized: bool) -> np.ndarray:
+        # Already-normalised input in the storage dtype (e.g. a memmap) is used as is
+        if normalized and getattr(embeddings, "dtype", None) == self.dtype:
+            return embeddings
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if not normalized:
+            vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10)
+        return vectors.astype(self.dtype, copy=False)
+
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        vectors = np.asarray(self.embedder.embed(queries), dtype=np.float32)
+        return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10)
+
+    def _scores(self, query_vec: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every chunk with unit-length queries.
+
+        ``query_vec`` is one query of shape (d,) or several as columns (d, m).
+        """
+        if self.embeddings.dtype == np.float32:
+            return self.embeddings @ query_vec
+
+        # float16 has no BLAS path: upcast cache-sized blocks into one reused buffer
+        scores = np.empty((len(self.embeddings),) + query_vec.shape[1:], dtype=np.float32)
+        upcast = np.empty((min(_SCORE_BLOCK, len(self.embeddings)), self.embeddings.shape[1]),
+                          dtype=np.float32)
+        for start in range(0, len(self.embeddings), _SCORE_BLOCK):
+            block = self.embeddings[start:start + _SCORE_BLOCK]
+            buffer = upcast[:len(block)]
+            np.copyto(buffer, block)
+            np.matmul(buffer, query_vec, out=scores[start:start + len(block)])
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Indices of the ``top_k`` highest scores, best first"""
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+
+        if k < len(scores):
+            indices = np.argpartition(-scores, k - 1)[:k]
+        else:
+            indices = np.arange(len(scores))
+        return indices[np.argsort(-scores[indices], kind="stable")]
+
+    @staticmethod
+    def _top_k_columns(scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-column top-k of an (n, m) score matrix as (m, k) indices and scores"""
+        k = min(top_k, scores.shape[0])
+        if k < scores.shape[0]:
+            indices = np.argpartition(-scores, k - 1, axis=0)[:k]
+        else:
+            indices = np.broadcast_to(np.arange(scores.shape[0])[:, None], scores.shape)
+
+        top = np.take_along_axis(scores, indices, axis=0)
+        order = np.argsort(-top, axis=0, kind="stable")
+        indices = np.take_along_axis(indices, order, axis=0)
+        top = np.take_along_axis(top, order, axis=0)
+        return indices.T, top.T
+
+    def _search(self, query_vecs: np.ndarray, top_k: int):
+        """Per-query (indices, scores) for unit-length query rows, best first"""
+        if self.ann is not None and self.ann.trained:
+            return self.ann.search(self.embeddings, query_vecs, top_k)
+
+        if len(query_vecs) == 1:
+            scores = self._scores(query_vecs[0])
+            indices = self._top_k(scores, top_k)
+            return [indices], [scores[indices]]
+
+        # Score queries in groups so the (chunks x queries) matrix stays bounded
+        group = max(1, _BATCH_SCORE_ELEMENTS // len(self.chunks))
+        all_indices, all_scores = [], []
+        for start in range(0, len(query_vecs), group):
+            scores = self._scores(query_vecs[start:start + group].T)
+            indices, top_scores = self._top_k_columns(scores, top_k)
+            all_indices.extend(indices)
+            all_scores.extend(top_scores)
+        return all_indices, all_scores
+
+    @staticmethod
+    def _fuse(rankings: List[np.ndarray], top_k: int, k: int = RRF_K) -> Tuple[np.ndarray, np.ndarray]:
+        """Reciprocal-rank fusion: sum of 1 / (k + rank) over the rankings a chunk appears in"""
+        fused = {}
+        for ranking in rankings:
+            for rank, index in enumerate(ranking.tolist()):
+                fused[index] = fused.get(index, 0.0) + 1.0 / (k + rank + 1)
+
+        best = sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+        return (np.array([i for i, _ in best], dtype=np.int64),
+                np.array([score for _, score in best], dtype=np.float32))
+
+    def _hybrid(self, queries: List[str], query_vecs: np.ndarray, top_k: int):
+        """Fuse dense and BM25 candidate rankings; scores are RRF scores"""
+        depth = max(top_k, RRF_CANDIDATES)
+        dense_indices, _ = self._search(query_vecs, depth)
+
+        all_indices, all_scores = [], []
+        for query, dense in zip(queries, dense_indices):
+            lexical, _ = self.lexical.search(query, depth)
+            # Lexical ranking first: on equal fused scores an exact term match wins
+            indices, scores = self._fuse([lexical, np.asarray(dense)], top_k)
+            all_indices.append(indices)
+            all_scores.append(scores)
+        return all_indices, all_scores
+
+    def get_relevant_chunks_batch(self, queries: List[str],
+                                  top_k: int = 3) -> List[Tuple[List[str], List[float]]]:
+        """Retrieve for many queries with one embedding batch and matrix-matrix scoring"""
         if self.embeddings is None or len(self.chunks) == 0:
-            return [], []
+            return [([], []) for _ in queries]
+        if not queries:
+            return []
+
+        query_vecs = self._embed_queries(list(queries))
+        if self.lexical is not None:
+            all_indices, all_scores = self._hybrid(list(queries), query_vecs, top_k)
+        else:
+            all_indices, all_scores = self._search(query_vecs, top_k)
 
-        query_vec = self.embedder.embed([query])[0]
+        return [
+            ([self.chunks[i] for i in indices], [float(score) for score in scores])
+            for indices, scores in zip(all_indices, all_scores)
+        ]
 
-        scores = np.dot(self.embeddings, query_vec) / (
-            np.linalg.norm(self.embeddings, axis=1) * np.linalg.norm(query_vec) + 1e-10
-        )
+    def get_relevant_chunks(self, query: str, top_k: int = 3) -> Tuple[List[str], List[float]]:
+        if self.embeddings is None or len(self.chunks) == 0:
+            return [], []
 
-        top_indices = np.argsort(scores)[-top_k:][::-1]
+        query_vecs = self._embed_queries([query])
+        if self.lexical is not None:
+            all_indices, all_scores = self._hybrid([query], query_vecs, top_k)
+        else:
+            all_indices, all_scores = self._search(query_vecs, top_k)
 
-        chunks = [self.chunks[i] for i in top_indices]
-        top_scores = [float(scores[i]) for i in top_indices]
+        chunks = [self.chunks[i] for i in all_indices[0]]
+        top_scores = [float(score) for score in all_scores[0]]
 
         return chunks, top_scores
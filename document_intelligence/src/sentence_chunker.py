@@ -0,0 +1,198 @@
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import nltk
+import numpy as np
+
+
+def _punkt_tokenizer(language: str = "english"):
+    """The same Punkt model ``sent_tokenize`` uses"""
+    try:
+        from nltk.tokenize import _get_punkt_tokenizer
+        return _get_punkt_tokenizer(language)
+    except ImportError:  # NLTK < 3.8.2
+        return nltk.data.load(f"tokenizers/punkt/{language}.pickle")
+
+
+# Sentences at the end of the text seen so far that ``stream`` does not pack yet
+_HOLD_BACK = 2
+
+
+class ChunkSpan(NamedTuple):
+    start: int           # character offset of the chunk in the segmented text
+    end: int             # exclusive end offset
+    first_sentence: int  # index of the first sentence in the chunk
+    end_sentence: int    # exclusive index of the last sentence
+
+
+class SentenceSegmentation:
+    """A text plus the start/end offsets of its sentences, computed once"""
+
+    def __init__(self, text: str, starts: np.ndarray, ends: np.ndarray):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def sentence(self, i: int) -> str:
+        return self.text[self.starts[i]:self.ends[i]]
+
+
+class SentencePacker:
+    """Greedy packing of sentences fed one at a time.
+
+    A chunk is closed when the next sentence would take the space-joined
+    length past ``chunk_size``; trailing sentences up to ``overlap``
+    characters are carried into the next chunk.
+    """
+
+    def __init__(self, chunk_size: int, overlap: int = 50):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.window = []  # (start, end, index) of the sentences in the open chunk
+        self.length = 0   # their space-joined length
+        self.count = 0    # sentences seen
+
+    @property
+    def first_start(self) -> Optional[int]:
+        return self.window[0][0] if self.window else None
+
+    def add(self, start: int, end: int) -> Optional[ChunkSpan]:
+        """Add the next sentence; returns the chunk it closed, if any"""
+        closed = None
+        if self.window and self.length + (end - start) > self.chunk_size:
+            closed = self._span()
+
+            # Carry trailing sentences that fit in the overlap window
+            overlap_len = 0
+            keep = len(self.window)
+            while keep > 0 and overlap_len + (self.window[keep - 1][1] - self.window[keep - 1][0]) <= self.overlap:
+                keep -= 1
+                overlap_len += self.window[keep][1] - self.window[keep][0] + 1
+            self.window = self.window[keep:]
+            self.length = sum(e - s for s, e, _ in self.window) + max(len(self.window) - 1, 0)
+
+        self.length += (end - start) + (1 if self.window else 0)
+        self.window.append((start, end, self.count))
+        self.count += 1
+        return closed
+
+    def flush(self) -> Optional[ChunkSpan]:
+        """Close the open chunk at the end of the text"""
+        closed = self._span() if self.window else None
+        self.window, self.length = [], 0
+        return closed
+
+    def _span(self) -> ChunkSpan:
+        first, last = self.window[0], self.window[-1]
+        return ChunkSpan(first[0], last[1], first[2], last[2] + 1)
+
+
+class SentenceChunker:
+    """Greedy sentence packing over precomputed offsets.
+
+    Produces the same chunk boundaries as the original ``chunk_text`` loop
+    (sentence-joined length against ``chunk_size``, trailing sentences up to
+    ``overlap`` characters carried into the next chunk), but the text is
+    segmented once and chunks are index ranges rather than rebuilt strings.
+    ``stream`` applies the same packing to text that arrives page by page.
+    """
+
+    def __init__(self, language: str = "english"):
+        self.language = language
+        self._tokenizer = None
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self._tokenizer = _punkt_tokenizer(self.language)
+        return self._tokenizer
+
+    def segment(self, text: str, clean: bool = True) -> SentenceSegmentation:
+        """Split ``text`` into sentence offsets (after whitespace normalisation)"""
+        if clean:
+            text = re.sub(r'\s+', ' ', text).strip()
+
+        spans = np.array(list(self.tokenizer.span_tokenize(text)), dtype=np.int64).reshape(-1, 2)
+        return SentenceSegmentation(text, spans[:, 0], spans[:, 1])
+
+    def chunk(self, segmentation: SentenceSegmentation, chunk_size: int,
+              overlap: int = 50) -> List[ChunkSpan]:
+        """Pack sentences into chunks, returning spans into ``segmentation.text``"""
+        packer = SentencePacker(chunk_size, overlap)
+        spans = []
+        for start, end in zip(segmentation.starts.tolist(), segmentation.ends.tolist()):
+            closed = packer.add(start, end)
+            if closed is not None:
+                spans.append(closed)
+
+        closed = packer.flush()
+        if closed is not None:
+            spans.append(closed)
+        return spans
+
+    def stream(self, pages: Iterable[Tuple[int, str]], chunk_size: int,
+               overlap: int = 50) -> Iterator[Tuple[str, int, int]]:
+        """Chunk (page_number, text) pairs as they arrive; yields (chunk, page_number, start).
+
+        Pages are cleaned and joined with single spaces into one running text,
+        so sentences may cross pages and chunks match ``chunk`` over the whole
+        text; ``start`` is the chunk's offset in that running text. The last
+        sentences seen are held back until the next page shows where they
+        end, and only the text of the open chunk is kept in memory. A chunk is
+        attributed to the page it starts on.
+        """
+        packer = SentencePacker(chunk_size, overlap)
+        buffer = ""       # running text from offset ``base``
+        base = 0
+        pending = 0       # offset of the first held-back sentence
+        page_starts = []  # (offset, page_number) of the pages still in the buffer
+
+        def emit(span: ChunkSpan):
+            page_number = next(number for offset, number in reversed(page_starts) if offset <= span.start)
+            return buffer[span.start - base:span.end - base], page_number, span.start
+
+        def add_sentences(final: bool):
+            nonlocal pending
+            spans = list(self.tokenizer.span_tokenize(buffer[pending - base:]))
+            if not final:
+                # Text still to come can move the last boundaries ("Mr.?" splits at the end)
+                spans = spans[:-_HOLD_BACK]
+            for start, end in spans:
+                closed = packer.add(pending + start, pending + end)
+                if closed is not None:
+                    yield emit(closed)
+            if spans:
+                # Everything before the next sentence has been packed
+                rest = buffer[pending + spans[-1][1] - base:]
+                pending += spans[-1][1] + len(rest) - len(rest.lstrip())
+
+        for page_number, page_text in pages:
+            page_text = re.sub(r'\s+', ' ', page_text).strip()
+            if not page_text:
+                continue
+
+            if buffer:
+                buffer += " "
+            page_starts.append((base + len(buffer), page_number))
+            buffer += page_text
+            yield from add_sentences(final=False)
+
+            # Drop text that neither the open chunk nor the held-back sentences need
+            keep = min(pending, packer.first_start if packer.first_start is not None else pending)
+            buffer = buffer[keep - base:]
+            base = keep
+            while len(page_starts) > 1 and page_starts[1][0] <= base:
+                page_starts.pop(0)
+
+        if buffer:
+            yield from add_sentences(final=True)
+        closed = packer.flush()
+        if closed is not None:
+            yield emit(closed)
+
+    def texts(self, segmentation: SentenceSegmentation, spans: List[ChunkSpan]) -> List[str]:
+        text = segmentation.text
+        return [text[span.start:span.end] for span in spans]